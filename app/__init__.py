@@ -2,18 +2,40 @@
 Flask application factory and service initialization.
 """
 
+import threading
+import orjson
+from typing import TYPE_CHECKING
 from flask import Flask, jsonify
-from app.config import Config
-from app.adapters.base import EcommerceAdapter
-from app.adapters.prestashop import PrestaShopAdapter
-from app.clients.klaviyo_client import KlaviyoClient
-from app.services.similar_products_service import SimilarProductsService
+from flask.json.provider import JSONProvider
+from app.config import CONFIG
 from app.utils.logger import get_logger
 
+if TYPE_CHECKING:
+    from app.services.similar_products_service import SimilarProductsService
+
 logger = get_logger(__name__)
 
-# Global service instance
+# Global service instance (built once per process, see get_service())
 _similar_products_service = None
+_service_lock = threading.Lock()
+
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (webhook bodies and responses)."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize obj to JSON string."""
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize JSON string or bytes.
+
+        Invalid JSON raises orjson.JSONDecodeError, a ValueError, which
+        Flask's request.get_json() turns into 400 Bad Request (or None
+        with silent=True).
+        """
+        return orjson.loads(s)
 
 
 def create_app():
@@ -24,44 +46,18 @@ def create_app():
         Configured Flask app instance
     """
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
 
     # Validate configuration
     try:
-        Config.validate()
+        CONFIG.validate()
         logger.info("Configuration validated successfully")
     except ValueError as e:
         logger.error(f"Configuration validation failed: {str(e)}")
         raise
 
-    # Initialize clients and service
-    global _similar_products_service
-
-    # Select e-commerce adapter based on platform
-    if Config.ECOMMERCE_PLATFORM.lower() == 'prestashop':
-        ecommerce_adapter = PrestaShopAdapter(
-            Config.ECOMMERCE_URL,
-            Config.ECOMMERCE_API_KEY,
-            Config.API_TIMEOUT
-        )
-        logger.info("Initialized PrestaShop adapter")
-    else:
-        raise ValueError(f"Unsupported e-commerce platform: {Config.ECOMMERCE_PLATFORM}")
-
-    # Initialize Klaviyo client
-    klaviyo_client = KlaviyoClient(
-        Config.KLAVIYO_API_KEY,
-        Config.KLAVIYO_API_REVISION,
-        Config.API_TIMEOUT
-    )
-    logger.info("Initialized Klaviyo client")
-
-    # Initialize service
-    _similar_products_service = SimilarProductsService(
-        ecommerce_adapter,
-        klaviyo_client,
-        Config.SIMILAR_PRODUCTS_LIMIT
-    )
-    logger.info("Initialized similar products service")
+    # Initialize clients and service (fail fast on misconfiguration)
+    get_service()
 
     # Register blueprints
     from app.webhooks import enrich, cleanup
@@ -85,11 +81,92 @@ def create_app():
     return app
 
 
-def get_service() -> SimilarProductsService:
+def get_service() -> 'SimilarProductsService':
     """
-    Get global service instance.
+    Get global service instance, building it on first call.
+
+    Thread-safe: every blueprint handler shares the same clients
+    (and therefore the same HTTP connection pools and caches).
 
     Returns:
         SimilarProductsService instance
     """
+    global _similar_products_service
+
+    if _similar_products_service is None:
+        with _service_lock:
+            if _similar_products_service is None:
+                _similar_products_service = _build_service()
+
     return _similar_products_service
+
+
+def _build_service() -> 'SimilarProductsService':
+    """
+    Build service with process-wide client instances.
+
+    Clients, adapters and the scoring stack (NumPy, httpx) are imported
+    here rather than at module level, so importing any app.* module stays
+    cheap and each gunicorn worker pays for them only when building the
+    service.
+
+    Returns:
+        SimilarProductsService instance
+
+    Raises:
+        ValueError: If e-commerce platform is not supported
+    """
+    from app.adapters.cached import CachedEcommerceAdapter
+    from app.adapters.prestashop import PrestaShopAdapter
+    from app.clients.klaviyo_client import KlaviyoClient
+    from app.services.profile_update_batcher import ProfileUpdateBatcher
+    from app.services.similar_products_service import SimilarProductsService
+
+    # Select e-commerce adapter based on platform
+    if CONFIG.ECOMMERCE_PLATFORM.lower() == 'prestashop':
+        ecommerce_adapter = PrestaShopAdapter.instance(
+            CONFIG.ECOMMERCE_URL,
+            CONFIG.ECOMMERCE_API_KEY,
+            CONFIG.API_TIMEOUT
+        )
+        logger.info("Initialized PrestaShop adapter")
+    else:
+        raise ValueError(f"Unsupported e-commerce platform: {CONFIG.ECOMMERCE_PLATFORM}")
+
+    # Reuse category listings across webhooks for the same category
+    if CONFIG.CATEGORY_CACHE_TTL > 0:
+        ecommerce_adapter = CachedEcommerceAdapter(ecommerce_adapter, CONFIG.CATEGORY_CACHE_TTL)
+        logger.info("Enabled category listing cache")
+
+    # Initialize Klaviyo client
+    klaviyo_client = KlaviyoClient.instance(
+        CONFIG.KLAVIYO_API_KEY,
+        CONFIG.KLAVIYO_API_REVISION,
+        CONFIG.API_TIMEOUT
+    )
+    logger.info("Initialized Klaviyo client")
+
+    # Optionally coalesce profile updates into Klaviyo bulk import jobs
+    batcher = None
+    if CONFIG.KLAVIYO_BATCH_WINDOW_MS > 0:
+        batcher = ProfileUpdateBatcher(
+            klaviyo_client,
+            CONFIG.KLAVIYO_BATCH_WINDOW_MS,
+            CONFIG.KLAVIYO_BATCH_MAX_SIZE
+        )
+        logger.info("Initialized Klaviyo profile update batcher")
+
+    # Initialize service
+    service = SimilarProductsService(
+        ecommerce_adapter,
+        klaviyo_client,
+        CONFIG.SIMILAR_PRODUCTS_LIMIT,
+        batcher,
+        wait_for_batch=not CONFIG.KLAVIYO_BATCH_ASYNC,
+        enrich_workers=CONFIG.ENRICH_WORKERS,
+        bm25_min_corpus=CONFIG.BM25_MIN_CORPUS,
+        similar_cache_ttl=CONFIG.SIMILAR_PRODUCTS_CACHE_TTL
+    )
+    logger.info("Initialized similar products service")
+
+    return service
@@ -6,17 +6,24 @@ Uses Adapter Pattern to allow future integration with multiple platforms
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from dataclasses import dataclass
+from typing import FrozenSet, List, Optional, Tuple
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Product:
     """
     Universal product representation across all e-commerce platforms.
 
     Contains fields required for intelligent similarity matching.
     Full product data (images, URLs) retrieved from Klaviyo Catalog.
+
+    Name tokens are computed once when the product is created (adapter
+    fetch time), so cached listings are never re-tokenized.
+
+    Immutable and slotted: listings are shared between requests through
+    caches, and categories can hold thousands of products. Use
+    dataclasses.replace() to derive a changed copy.
     """
 
     id: str
@@ -30,6 +37,19 @@ class Product:
     name_secondary: Optional[str] = None  # Second language name (if available)
     sku: Optional[str] = None
 
+    # Similarity tokens of name / name_secondary (set in __post_init__)
+    tokens_primary: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    tokens_secondary: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Tokenize names for similarity scoring."""
+        # Local import - product_similarity imports Product from here
+        from app.services.product_similarity import _tokenize_product_name
+
+        # Frozen dataclass - set derived fields through object.__setattr__
+        object.__setattr__(self, 'tokens_primary', _tokenize_product_name(self.name))
+        object.__setattr__(self, 'tokens_secondary', _tokenize_product_name(self.name_secondary))
+
 
 class EcommerceAdapter(ABC):
     """Abstract base class for e-commerce platform adapters."""
@@ -71,6 +91,34 @@ class EcommerceAdapter(ABC):
         """
         pass
 
+    def get_product_with_siblings(
+        self,
+        product_id: str,
+        limit: int = 50
+    ) -> Tuple[Optional[Product], List[Product]]:
+        """
+        Retrieve product together with products from its category.
+
+        Default composes get_product() and get_products_by_category(), so
+        wrappers like CachedEcommerceAdapter serve the listing from cache.
+        Override when the platform can return both in fewer requests.
+
+        Args:
+            product_id: Platform-specific product identifier
+            limit: Maximum number of category products to return
+
+        Returns:
+            Tuple of (product or None if not found, category products)
+
+        Raises:
+            EcommerceAPIError: If API request fails
+        """
+        product = self.get_product(product_id)
+        if product is None:
+            return None, []
+
+        return product, self.get_products_by_category(product.category_id, limit)
+
     @abstractmethod
     def health_check(self) -> bool:
         """
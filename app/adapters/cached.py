@@ -0,0 +1,98 @@
+"""
+Caching decorator for e-commerce adapters.
+"""
+
+import threading
+from cachetools import TTLCache
+from typing import List, Optional
+from app.adapters.base import EcommerceAdapter, Product
+
+
+class CachedEcommerceAdapter(EcommerceAdapter):
+    """
+    Wraps any adapter and caches category listings for a short time.
+
+    Category listings are the slowest call per webhook and the same
+    category is usually requested many times within a minute, while
+    its products don't change second-to-second.
+    """
+
+    def __init__(
+        self,
+        adapter: EcommerceAdapter,
+        ttl: int = 60,
+        maxsize: int = 256
+    ):
+        """
+        Initialize caching adapter.
+
+        Args:
+            adapter: Adapter to delegate to
+            ttl: How long a category listing is reused (seconds)
+            maxsize: Maximum number of cached listings
+        """
+        self.adapter = adapter
+
+        # (category_id, limit) -> tuple of products (immutable, like Product)
+        # Shared by Flask's threaded workers, hence the lock
+        self._categories = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get_product(self, product_id: str) -> Optional[Product]:
+        """
+        Fetch single product (not cached).
+
+        Args:
+            product_id: Platform-specific product identifier
+
+        Returns:
+            Product object or None if not found
+
+        Raises:
+            EcommerceAPIError: If API request fails
+        """
+        return self.adapter.get_product(product_id)
+
+    def get_products_by_category(
+        self,
+        category_id: str,
+        limit: int = 50
+    ) -> List[Product]:
+        """
+        Fetch products from category, reusing listing fetched within TTL.
+
+        Args:
+            category_id: Platform-specific category identifier
+            limit: Maximum number of products to return
+
+        Returns:
+            List of Product objects (new list, safe to modify)
+
+        Raises:
+            EcommerceAPIError: If API request fails
+        """
+        key = (category_id, limit)
+        with self._lock:
+            products = self._categories.get(key)
+
+        if products is None:
+            # Fetch outside the lock so other categories aren't blocked
+            products = tuple(self.adapter.get_products_by_category(category_id, limit))
+            with self._lock:
+                self._categories[key] = products
+
+        return list(products)
+
+    def cache_clear(self) -> None:
+        """Drop all cached category listings (e.g. after a catalog import)."""
+        with self._lock:
+            self._categories.clear()
+
+    def health_check(self) -> bool:
+        """
+        Verify API connection and credentials.
+
+        Returns:
+            True if connection successful, False otherwise
+        """
+        return self.adapter.health_check()
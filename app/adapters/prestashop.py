@@ -5,8 +5,14 @@ NOTE: This adapter is tested with PrestaShop 1.7.x WebService API.
       Newer versions (1.8+, 8.x) may have different API structures.
 """
 
+import dataclasses
+import threading
+import orjson
 import requests
-from typing import List, Optional
+from operator import itemgetter
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib3.util.retry import Retry
 from app.adapters.base import EcommerceAdapter, Product, EcommerceAPIError
 
 
@@ -17,6 +23,13 @@ class PrestaShopAdapter(EcommerceAdapter):
     Tested with PrestaShop 1.7.x API. Newer versions may require adjustments.
     """
 
+    # Errors a malformed product record can raise while parsing
+    _PARSE_ERRORS = (KeyError, ValueError, TypeError, AttributeError)
+
+    # Process-wide instance, see instance()
+    _instance = None
+    _instance_lock = threading.Lock()
+
     def __init__(self, base_url: str, api_key: str, timeout: int = 10):
         """
         Initialize PrestaShop adapter.
@@ -27,6 +40,10 @@ class PrestaShopAdapter(EcommerceAdapter):
             timeout: HTTP request timeout in seconds
         """
         self.base_url = base_url.rstrip('/')
+        # Endpoint URLs are built once instead of on every request
+        self._api_url = self.base_url + "/api"
+        self._products_url = self._api_url + "/products"
+        self._stock_url = self._api_url + "/stock_availables"
         self.api_key = api_key
         self.timeout = timeout
 
@@ -36,6 +53,50 @@ class PrestaShopAdapter(EcommerceAdapter):
         self.session.headers.update({
             'User-Agent': 'Klaviyo-PrestaShop-Similar-Products/1.0'
         })
+        # WebService key as HTTP Basic auth (empty password) keeps it out of URLs
+        self.session.auth = (api_key, '')
+
+        # Larger pool so concurrent webhook workers keep their connections
+        # alive instead of paying a new TLS handshake, plus retries on
+        # transient errors (idempotent methods only)
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=64,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET", "HEAD"})
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Health probes fail fast - one attempt, no retries or backoff
+        self._probe_session = requests.Session()
+        self._probe_session.headers.update(self.session.headers)
+        self._probe_session.auth = self.session.auth
+        probe_adapter = HTTPAdapter(max_retries=0)
+        self._probe_session.mount("https://", probe_adapter)
+        self._probe_session.mount("http://", probe_adapter)
+
+    @classmethod
+    def instance(cls, *args, **kwargs) -> "PrestaShopAdapter":
+        """
+        Get process-wide adapter instance, creating it on first call.
+
+        Every caller shares the same Session (connection pool).
+        Arguments are only used for the first construction.
+
+        Returns:
+            Shared PrestaShopAdapter instance
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(*args, **kwargs)
+
+        return cls._instance
 
     def get_product(self, product_id: str) -> Optional[Product]:
         """
@@ -53,9 +114,8 @@ class PrestaShopAdapter(EcommerceAdapter):
             EcommerceAPIError: If API request fails
         """
         try:
-            url = f"{self.base_url}/api/products/{product_id}"
+            url = self._products_url + "/" + str(product_id)
             params = {
-                "ws_key": self.api_key,
                 "output_format": "JSON",
                 "display": "full"
             }
@@ -66,18 +126,23 @@ class PrestaShopAdapter(EcommerceAdapter):
                 return None
 
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             # PrestaShop API can return either {"product": {...}} or {"products": [{...}]}
             # depending on authentication method and parameters
             if 'product' in data:
-                return self._parse_product(data['product'])
+                product_data = data['product']
             elif 'products' in data and isinstance(data['products'], list) and len(data['products']) > 0:
-                return self._parse_product(data['products'][0])
+                product_data = data['products'][0]
             else:
                 return None
 
-        except requests.RequestException as e:
+            try:
+                return self._parse_product_unchecked(product_data)
+            except self._PARSE_ERRORS:
+                return None
+
+        except (requests.RequestException, ValueError) as e:
             raise EcommerceAPIError(f"PrestaShop API error: {str(e)}")
 
     def get_products_by_category(
@@ -89,9 +154,9 @@ class PrestaShopAdapter(EcommerceAdapter):
         Fetch products from category using batch fetching for performance.
 
         Strategy:
-        1. GET /api/products?filter[id_category_default]=[{id}] → get list of IDs
-        2. GET /api/products?filter[id]=[ID1|ID2|ID3...] → batch fetch product data
-        3. GET /api/stock_availables?filter[id_product]=[ID1|ID2|...] → batch fetch stock
+        1. GET /api/products?filter[id_category_default]=[{id}]&display=[...]
+           → product data for the whole category in one call
+        2. GET /api/stock_availables?filter[id_product]=[ID1|ID2|...] → batch fetch stock
 
         Note: PrestaShop may have stock in separate endpoint if disabled in products.
 
@@ -106,81 +171,58 @@ class PrestaShopAdapter(EcommerceAdapter):
             EcommerceAPIError: If API request fails
         """
         try:
-            # Step 1: Get product IDs from category (only active products)
-            url = f"{self.base_url}/api/products"
+            # Step 1: Get product data from category (only active products)
+            url = self._products_url
             params = {
-                "ws_key": self.api_key,
                 "output_format": "JSON",
                 "filter[id_category_default]": f"[{category_id}]",
                 "filter[active]": "[1]",
+                # Only fetch fields we need (reduces bandwidth)
+                "display": "[id,name,id_category_default,price,manufacturer_name]",
                 "limit": limit
             }
 
             response = self.session.get(url, params=params, timeout=self.timeout)
             response.raise_for_status()
-            data = response.json()
-
-            # Extract product IDs
-            product_ids = []
-            for item in data.get('products', []):
-                if isinstance(item, dict) and 'id' in item:
-                    product_ids.append(str(item['id']))
+            data = orjson.loads(response.content)
+            products_dict = self._parse_products(data.get('products', []))
 
-            if not product_ids:
+            if not products_dict:
                 return []
 
-            # Step 2: Batch fetch product data (only active products)
-            ids_filter = "|".join(product_ids)
+            # Step 2: Batch fetch stock quantities from stock_availables
+            ids_filter = "|".join(products_dict)
 
+            # Product associations only list stock_available IDs (no quantity),
+            # so stock stays a separate call. Restrict it to the product-level
+            # rows (id_product_attribute=0 holds the total across combinations)
+            # instead of downloading one row per combination.
             params = {
-                "ws_key": self.api_key,
                 "output_format": "JSON",
-                "filter[id]": f"[{ids_filter}]",
-                "filter[active]": "[1]",
-                # Only fetch fields we need (reduces bandwidth)
-                "display": "[id,name,id_category_default,price,manufacturer_name]"
+                "filter[id_product]": f"[{ids_filter}]",
+                "filter[id_product_attribute]": "[0]",
+                "display": "[id_product,quantity]"
             }
 
-            response = self.session.get(url, params=params, timeout=self.timeout)
+            response = self.session.get(self._stock_url, params=params, timeout=self.timeout)
             response.raise_for_status()
-            data = response.json()
+            stock_data = orjson.loads(response.content)
 
-            # Parse products (without quantity yet)
-            products_dict = {}
-            for product_data in data.get('products', []):
+            # Update products with stock quantities (Product is immutable)
+            stock_fields = itemgetter('id_product', 'quantity')
+            for stock_item in stock_data.get('stock_availables', ()):
                 try:
-                    product = self._parse_product(product_data)
-                    if product:
-                        products_dict[product.id] = product
-                except Exception:
+                    product_id, quantity = stock_fields(stock_item)
+                    product_id = str(product_id)
+                    product = products_dict.get(product_id)
+                    if product is not None:
+                        products_dict[product_id] = dataclasses.replace(product, quantity=int(quantity))
+                except (KeyError, ValueError, TypeError):
                     continue
 
-            # Step 3: Batch fetch stock quantities from stock_availables
-            stock_url = f"{self.base_url}/api/stock_availables"
-            params = {
-                "ws_key": self.api_key,
-                "output_format": "JSON",
-                "filter[id_product]": f"[{ids_filter}]",
-                "display": "[id_product,quantity]"
-            }
-
-            response = self.session.get(stock_url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            stock_data = response.json()
-
-            # Update products with stock quantities
-            for stock_item in stock_data.get('stock_availables', []):
-                product_id = str(stock_item.get('id_product', ''))
-                if product_id in products_dict:
-                    try:
-                        quantity = int(stock_item.get('quantity', 0))
-                        products_dict[product_id].quantity = quantity
-                    except (ValueError, TypeError):
-                        pass
-
             return list(products_dict.values())
 
-        except requests.RequestException as e:
+        except (requests.RequestException, ValueError) as e:
             raise EcommerceAPIError(f"PrestaShop API error: {str(e)}")
 
     def health_check(self) -> bool:
@@ -191,79 +233,101 @@ class PrestaShopAdapter(EcommerceAdapter):
             True if connection successful, False otherwise
         """
         try:
-            url = f"{self.base_url}/api"
-            response = self.session.head(url, timeout=5)
+            url = self._api_url
+            # Short (connect, read) timeouts - probes must not block workers
+            response = self._probe_session.head(url, timeout=(1.0, 2.0), allow_redirects=False)
             # 200 = OK, 401 = API exists but requires auth (expected for HEAD)
             return response.status_code in [200, 401]
         except Exception:
             return False
 
-    def _parse_product(self, data: dict) -> Optional[Product]:
+    def _parse_products(self, items: Iterable[dict]) -> Dict[str, Product]:
+        """
+        Parse PrestaShop product list into products indexed by ID.
+
+        Args:
+            items: Product data from PrestaShop API
+
+        Returns:
+            Dictionary mapping product ID -> Product (quantity not set yet)
+        """
+        products_dict = {}
+        for product_data in items:
+            try:
+                product = self._parse_product_unchecked(product_data)
+            except self._PARSE_ERRORS:
+                continue
+            if product:
+                products_dict[product.id] = product
+
+        return products_dict
+
+    def _parse_product_unchecked(self, data: dict) -> Optional[Product]:
         """
         Parse PrestaShop product response into universal Product.
 
         Handles multi-language fields and varying response structures.
+        Malformed records raise; callers guard with _PARSE_ERRORS once
+        per record instead of a try block here.
 
         Args:
             data: Product data from PrestaShop API
 
         Returns:
-            Product object or None if parsing fails
+            Product object or None if ID or name is missing
+
+        Raises:
+            KeyError, ValueError, TypeError, AttributeError: If data is malformed
         """
         if not data:
             return None
 
-        try:
-            # Extract product ID
-            product_id = str(data.get('id', ''))
-
-            # Extract names (multi-language support)
-            name_primary = self._extract_multilang_field(data.get('name', ''), lang_id='1')
-            name_secondary = self._extract_multilang_field(data.get('name', ''), lang_id='2')
-
-            # Use primary if available, fallback to any name
-            if not name_primary:
-                name_primary = self._extract_multilang_field(data.get('name', ''))
-
-            # Extract category (prefer id_category_default)
-            category_id = str(data.get('id_category_default', ''))
-
-            # Extract quantity (direct field or from associations)
-            quantity = 0
-            if 'associations' in data and 'stock_availables' in data['associations']:
-                stock_data = data['associations']['stock_availables']
-                if isinstance(stock_data, list) and len(stock_data) > 0:
-                    quantity = int(stock_data[0].get('quantity', 0))
-            elif 'quantity' in data:
-                quantity = int(data.get('quantity', 0))
-
-            # Extract price
-            price = None
-            if 'price' in data:
-                try:
-                    price = float(data.get('price', 0))
-                except (ValueError, TypeError):
-                    price = None
+        # Extract product ID
+        product_id = str(data.get('id', ''))
 
-            # Extract manufacturer
-            manufacturer_name = data.get('manufacturer_name', None)
+        # Extract names (multi-language support), indexing languages once
+        names, first_name = self._index_multilang_field(data.get('name', ''))
 
-            if not product_id or not name_primary:
-                return None
+        # Use primary if available, fallback to any name
+        name_primary = names.get('1') or first_name
+        name_secondary = names.get('2', first_name)
 
-            return Product(
-                id=product_id,
-                name=name_primary,
-                name_secondary=name_secondary if name_secondary else None,
-                category_id=category_id,
-                quantity=quantity,
-                price=price,
-                manufacturer_name=manufacturer_name
-            )
+        # Extract category (prefer id_category_default)
+        category_id = str(data.get('id_category_default', ''))
 
-        except Exception:
+        # Extract quantity (direct field or from associations)
+        quantity = 0
+        if 'associations' in data and 'stock_availables' in data['associations']:
+            stock_data = data['associations']['stock_availables']
+            if isinstance(stock_data, list) and len(stock_data) > 0:
+                quantity = int(stock_data[0].get('quantity', 0))
+        elif 'quantity' in data:
+            quantity = int(data.get('quantity', 0))
+
+        # Extract price
+        price = None
+        if 'price' in data:
+            try:
+                price = float(data.get('price', 0))
+            except (ValueError, TypeError):
+                price = None
+
+        # Extract manufacturer
+        manufacturer_name = data.get('manufacturer_name', None)
+
+        if not product_id or not name_primary:
             return None
 
+        return Product(
+            id=product_id,
+            name=name_primary,
+            name_secondary=name_secondary if name_secondary else None,
+            category_id=category_id,
+            quantity=quantity,
+            price=price,
+            manufacturer_name=manufacturer_name
+        )
+
     def _extract_multilang_field(self, field, lang_id: str = None) -> str:
         """
         Extract value from PrestaShop multi-language field.
@@ -281,21 +345,37 @@ class PrestaShopAdapter(EcommerceAdapter):
         Returns:
             Extracted string value
         """
-        if isinstance(field, str):
-            return field
+        names, first_value = self._index_multilang_field(field)
+        if lang_id and lang_id in names:
+            return names[lang_id]
+        return first_value
 
-        if isinstance(field, list) and len(field) > 0:
-            # If specific language requested
-            if lang_id:
-                for item in field:
-                    if isinstance(item, dict) and item.get('id') == lang_id:
-                        return item.get('value', '')
+    @staticmethod
+    def _index_multilang_field(field) -> Tuple[Dict[str, str], str]:
+        """
+        Index PrestaShop multi-language field by language ID.
+
+        Lets callers look up several languages without rescanning the list.
 
-            # Fallback: take first language entry
-            if isinstance(field[0], dict):
-                return field[0].get('value', '')
+        Args:
+            field: Multi-language field from PrestaShop (string, array or dict)
+
+        Returns:
+            Tuple of (language ID -> value, fallback value). Fallback is the
+            first language entry, or the plain value for string/dict fields.
+        """
+        if isinstance(field, str):
+            return {}, field
+
+        if isinstance(field, list):
+            names = {
+                item.get('id'): item.get('value', '')
+                for item in field if isinstance(item, dict)
+            }
+            first_value = field[0].get('value', '') if field and isinstance(field[0], dict) else ''
+            return names, first_value
 
         if isinstance(field, dict):
-            return field.get('value', '')
+            return {}, field.get('value', '')
 
-        return ''
+        return {}, ''
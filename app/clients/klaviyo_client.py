@@ -2,8 +2,18 @@
 Klaviyo REST API client.
 """
 
-import requests
-from typing import Optional, List
+import threading
+import time
+import httpx
+import orjson
+from cachetools import TTLCache
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, List, Dict, Tuple
+
+
+# Shared pool for overlapping Klaviyo lookups with other work
+# (threads are started lazily, so it's safe to create before forking)
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="klaviyo")
 
 
 class KlaviyoAPIError(Exception):
@@ -11,12 +21,138 @@ class KlaviyoAPIError(Exception):
     pass
 
 
+class _RetryTransport(httpx.HTTPTransport):
+    """
+    HTTP/2 transport that retries rate-limited / transient failures.
+
+    httpx only retries failed connection attempts, so status-based retries
+    (with exponential backoff, honouring Retry-After) are done here.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    # PATCH of properties is idempotent, bulk import POSTs are not
+    RETRY_METHODS = frozenset({"GET", "HEAD", "PATCH"})
+
+    def __init__(self, total: int = 3, backoff_factor: float = 0.3, **kwargs):
+        """
+        Initialize transport.
+
+        Args:
+            total: Maximum number of retries
+            backoff_factor: Base delay in seconds (doubled on every retry)
+            **kwargs: Passed to httpx.HTTPTransport
+        """
+        super().__init__(retries=total, **kwargs)
+        self.total = total
+        self.backoff_factor = backoff_factor
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        """Send request, retrying retryable responses."""
+        for attempt in range(self.total + 1):
+            response = super().handle_request(request)
+            if (
+                attempt == self.total
+                or request.method not in self.RETRY_METHODS
+                or response.status_code not in self.RETRY_STATUSES
+            ):
+                return response
+
+            retry_after = response.headers.get("Retry-After", "")
+            response.close()
+            time.sleep(
+                float(retry_after) if retry_after.isdigit()
+                else self.backoff_factor * (2 ** attempt)
+            )
+
+        return response
+
+
+def _quote_filter_value(value: str) -> str:
+    """
+    Quote string for Klaviyo filter expressions.
+
+    Escapes backslashes and double quotes so emails like a"b@example.com
+    can't break out of the filter string.
+
+    Args:
+        value: Raw string value
+
+    Returns:
+        Double-quoted, escaped value
+    """
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _merge_similar_products(
+    existing_array: List[dict],
+    product_id: str,
+    similar_product_ids: List[str],
+    enriched_at: str
+) -> Optional[List[dict]]:
+    """
+    Merge new entry into bis_similar_products array.
+
+    Entries are indexed by product_id, so duplicates stored earlier are
+    collapsed and the new entry replaces (and moves after) the old one.
+
+    Args:
+        existing_array: Current bis_similar_products array
+        product_id: Product user subscribed to
+        similar_product_ids: List of similar product IDs
+        enriched_at: ISO timestamp
+
+    Returns:
+        Merged array, or None if the stored similar_ids are already the same
+    """
+    by_id = {
+        item.get('product_id'): item
+        for item in existing_array if isinstance(item, dict)
+    }
+
+    current = by_id.pop(product_id, None)
+    if current is not None and current.get('similar_ids') == similar_product_ids:
+        return None
+
+    by_id[product_id] = {
+        "product_id": product_id,
+        "similar_ids": similar_product_ids,
+        "enriched_at": enriched_at
+    }
+    return list(by_id.values())
+
+
 class KlaviyoClient:
     """Klaviyo REST API client with array of objects support."""
 
     BASE_URL = "https://a.klaviyo.com/api"
 
-    def __init__(self, api_key: str, revision: str = "2024-10-15", timeout: int = 10):
+    # Klaviyo accepts up to 10,000 profiles per bulk import job
+    BULK_IMPORT_MAX_PROFILES = 10000
+
+    # Bulk import jobs are applied asynchronously. Profiles in a job this
+    # process sent are read again only once the job is done, otherwise the
+    # next merge would start from the array the job is about to replace.
+    BULK_IMPORT_POLL_INTERVAL = 0.5  # seconds
+    BULK_IMPORT_WAIT_TIMEOUT = 30  # seconds
+    # Jobs older than this are assumed applied and no longer tracked
+    BULK_IMPORT_TRACK_TTL = 600  # seconds
+    BULK_IMPORT_TRACK_MAX_SIZE = 100000
+    BULK_IMPORT_PENDING_STATUSES = frozenset({"queued", "processing"})
+
+    # Maximum emails per any(email,[...]) profile filter
+    PROFILE_FILTER_MAX_EMAILS = 100
+
+    # Process-wide instance, see instance()
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        api_key: str,
+        revision: str = "2024-10-15",
+        timeout: int = 10,
+        client: Optional[httpx.Client] = None
+    ):
         """
         Initialize Klaviyo client.
 
@@ -24,24 +160,74 @@ class KlaviyoClient:
             api_key: Klaviyo private API key (pk_xxx)
             revision: API revision date
             timeout: Request timeout in seconds
+            client: Existing HTTP client to send requests through (e.g. one
+                    connection pool shared by tests). Klaviyo headers are
+                    added to it. If None, a pooled HTTP/2 client is created.
         """
         self.api_key = api_key
         self.revision = revision
         self.timeout = timeout
 
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Endpoint URLs are built once instead of on every request
+        self._profiles_url = self.BASE_URL + "/profiles/"
+        self._bulk_import_url = self.BASE_URL + "/profile-bulk-import-jobs/"
+
+        headers = {
             "Authorization": f"Klaviyo-API-Key {api_key}",
             "Accept": "application/json",
             "Content-Type": "application/json",
             "revision": revision
-        })
+        }
+
+        if client is not None:
+            client.headers.update(headers)
+            self.client = client
+            # Retries of a given client are up to its owner
+            self._probe_client = client
+        else:
+            # HTTP/2 multiplexes concurrent webhook workers' requests over
+            # one kept-alive connection instead of one connection per request
+            self.client = httpx.Client(
+                headers=headers,
+                timeout=timeout,
+                transport=_RetryTransport(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+                )
+            )
+            # Health probes fail fast - one attempt, no connect or status retries
+            self._probe_client = httpx.Client(headers=headers, timeout=timeout)
+
+        # email -> ID of the last bulk import job that updated it
+        # Shared by Flask's threaded workers, hence the lock
+        self._pending_imports = TTLCache(
+            maxsize=self.BULK_IMPORT_TRACK_MAX_SIZE, ttl=self.BULK_IMPORT_TRACK_TTL
+        )
+        self._pending_imports_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls, *args, **kwargs) -> "KlaviyoClient":
+        """
+        Get process-wide client instance, creating it on first call.
+
+        Every caller shares the same HTTP client (connection pool).
+        Arguments are only used for the first construction.
+
+        Returns:
+            Shared KlaviyoClient instance
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(*args, **kwargs)
+
+        return cls._instance
 
     def get_profile_id_by_email(self, email: str) -> Optional[str]:
         """
         Find profile ID by email address.
 
-        GET /profiles/?filter=equals(email,"{email}")
+        Thin wrapper around get_profile_ids_by_emails().
 
         Args:
             email: User email address
@@ -52,21 +238,30 @@ class KlaviyoClient:
         Raises:
             KlaviyoAPIError: If API request fails
         """
-        try:
-            url = f"{self.BASE_URL}/profiles/"
-            params = {"filter": f'equals(email,"{email}")'}
+        return self.get_profile_ids_by_emails([email]).get(email)
 
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
+    def get_profile_ids_by_emails(self, emails: List[str]) -> Dict[str, str]:
+        """
+        Find profile IDs for many email addresses at once.
 
-            data = response.json()
-            if data.get('data') and len(data['data']) > 0:
-                return data['data'][0]['id']
+        GET /profiles/?filter=any(email,["a@example.com","b@example.com"])
 
-            return None
+        Up to PROFILE_FILTER_MAX_EMAILS emails are looked up per request
+        (following pagination).
 
-        except requests.RequestException as e:
-            raise KlaviyoAPIError(f"Failed to get profile: {str(e)}")
+        Args:
+            emails: User email addresses
+
+        Returns:
+            Dictionary mapping email -> profile ID (emails without profile omitted)
+
+        Raises:
+            KlaviyoAPIError: If API request fails
+        """
+        return {
+            email: profile_id
+            for email, (profile_id, _) in self._resolve_profiles(emails).items()
+        }
 
     def update_profile_properties(
         self,
@@ -89,7 +284,7 @@ class KlaviyoClient:
             KlaviyoAPIError: If API request fails
         """
         try:
-            url = f"{self.BASE_URL}/profiles/{profile_id}/"
+            url = self._profiles_url + profile_id + "/"
             payload = {
                 "data": {
                     "type": "profile",
@@ -100,20 +295,41 @@ class KlaviyoClient:
                 }
             }
 
-            response = self.session.patch(url, json=payload, timeout=self.timeout)
+            response = self.client.patch(url, content=orjson.dumps(payload))
             response.raise_for_status()
 
             return True
 
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise KlaviyoAPIError(f"Failed to update profile: {str(e)}")
 
+    def prefetch_profile(self, email: str) -> Future:
+        """
+        Start resolving profile in the background.
+
+        Lets callers overlap the Klaviyo lookup with other network calls
+        (e.g. fetching products) and pass the Future to add_similar_products().
+
+        The array is read when the lookup runs, so an update another worker
+        makes to the same profile between the lookup and the PATCH (while
+        products are fetched and scored, typically well under a second) is
+        overwritten. Callers that can't accept that window should not prefetch.
+
+        Args:
+            email: User email
+
+        Returns:
+            Future resolving to (profile_id, bis_similar_products)
+        """
+        return _EXECUTOR.submit(self._resolve_profile, email)
+
     def add_similar_products(
         self,
         email: str,
         product_id: str,
         similar_product_ids: List[str],
-        enriched_at: str
+        enriched_at: str,
+        prefetched: Optional[Future] = None
     ) -> bool:
         """
         Add similar products to profile using array of objects structure.
@@ -138,6 +354,7 @@ class KlaviyoClient:
             product_id: Product user subscribed to
             similar_product_ids: List of similar product IDs
             enriched_at: ISO timestamp
+            prefetched: Future from prefetch_profile(email), if already started
 
         Returns:
             True if successful
@@ -145,32 +362,116 @@ class KlaviyoClient:
         Raises:
             KlaviyoAPIError: If profile not found or update fails
         """
-        profile_id = self.get_profile_id_by_email(email)
+        # Get profile with its similar products array (prefetched one may be
+        # slightly stale, see prefetch_profile())
+        if prefetched is not None:
+            profile_id, existing_array = prefetched.result()
+        else:
+            profile_id, existing_array = self._resolve_profile(email)
         if not profile_id:
             raise KlaviyoAPIError(f"Profile not found for email: {email}")
 
-        # Get existing similar products array
-        existing_array = self._get_similar_products_array(profile_id)
-
-        # Remove old entry for same product_id if exists
-        existing_array = [
-            item for item in existing_array
-            if item.get('product_id') != product_id
-        ]
-
-        # Add new entry
-        new_entry = {
-            "product_id": product_id,
-            "similar_ids": similar_product_ids,
-            "enriched_at": enriched_at
-        }
-        existing_array.append(new_entry)
+        merged_array = _merge_similar_products(
+            existing_array, product_id, similar_product_ids, enriched_at
+        )
+        if merged_array is None:
+            # Same recommendations already stored - nothing to update
+            return True
 
         # Update profile
         return self.update_profile_properties(profile_id, {
-            "bis_similar_products": existing_array
+            "bis_similar_products": merged_array
         })
 
+    def bulk_add_similar_products(
+        self,
+        entries: List[Tuple[str, str, List[str], str]]
+    ) -> Dict[str, bool]:
+        """
+        Add similar products to many profiles with a single bulk import job.
+
+        POST /profile-bulk-import-jobs/
+
+        Existing arrays are merged the same way as in add_similar_products,
+        multiple entries for the same email are combined into one profile
+        update. Profiles that don't exist are skipped (never created), as
+        are profiles whose stored recommendations are unchanged.
+
+        Emails still in an earlier bulk import job are read only after that
+        job completes, so consecutive calls don't overwrite each other.
+
+        Args:
+            entries: List of (email, product_id, similar_product_ids, enriched_at)
+
+        Returns:
+            Dictionary mapping email -> True if profile is up to date
+            (updated or unchanged), False if profile not found
+
+        Raises:
+            KlaviyoAPIError: If bulk import request fails
+        """
+        emails = list(dict.fromkeys(entry[0] for entry in entries))
+
+        # Look up all profiles (with their arrays) using batched searches
+        self._wait_for_pending_imports(emails)
+        found = self._resolve_profiles(emails)
+        resolved = {email: found.get(email, (None, [])) for email in emails}
+
+        # Merge new entries into each profile's existing array
+        arrays: Dict[str, List[dict]] = {}
+        for email, product_id, similar_product_ids, enriched_at in entries:
+            profile_id, existing_array = resolved[email]
+            if not profile_id:
+                continue
+
+            merged_array = _merge_similar_products(
+                arrays.get(email, existing_array),
+                product_id, similar_product_ids, enriched_at
+            )
+            if merged_array is not None:
+                arrays[email] = merged_array
+
+        profiles = [
+            {
+                "type": "profile",
+                "id": resolved[email][0],
+                "attributes": {
+                    "email": email,
+                    "properties": {"bis_similar_products": array}
+                }
+            }
+            for email, array in arrays.items()
+        ]
+
+        try:
+            url = self._bulk_import_url
+            # Profiles whose recommendations didn't change aren't sent at all
+            for start in range(0, len(profiles), self.BULK_IMPORT_MAX_PROFILES):
+                chunk = profiles[start:start + self.BULK_IMPORT_MAX_PROFILES]
+                payload = {
+                    "data": {
+                        "type": "profile-bulk-import-job",
+                        "attributes": {
+                            "profiles": {
+                                "data": chunk
+                            }
+                        }
+                    }
+                }
+
+                response = self.client.post(url, content=orjson.dumps(payload))
+                response.raise_for_status()
+
+                job_id = orjson.loads(response.content)['data']['id']
+                with self._pending_imports_lock:
+                    for profile in chunk:
+                        self._pending_imports[profile['attributes']['email']] = job_id
+
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            raise KlaviyoAPIError(f"Failed to bulk update profiles: {str(e)}")
+
+        return {email: resolved[email][0] is not None for email in emails}
+
     def remove_similar_products(
         self,
         email: str,
@@ -187,7 +488,7 @@ class KlaviyoClient:
         Returns:
             True if successful
         """
-        profile_id = self.get_profile_id_by_email(email)
+        profile_id, existing_array = self._resolve_profile(email)
         if not profile_id:
             return False
 
@@ -198,7 +499,6 @@ class KlaviyoClient:
             })
         else:
             # Remove specific product entry
-            existing_array = self._get_similar_products_array(profile_id)
             filtered_array = [
                 item for item in existing_array
                 if item.get('product_id') != product_id
@@ -214,36 +514,159 @@ class KlaviyoClient:
                     "bis_similar_products": filtered_array
                 })
 
-    def _get_similar_products_array(self, profile_id: str) -> List[dict]:
+    def health_check(self) -> bool:
+        """
+        Test Klaviyo API connection and credentials.
+
+        GET /profiles/?page[size]=1
+
+        Returns:
+            True if connection successful, False otherwise
         """
-        Get existing bis_similar_products array from profile.
+        try:
+            url = self._profiles_url
+            # Short (connect, read) timeouts - probes must not block workers
+            response = self._probe_client.get(
+                url,
+                params={"page[size]": 1},
+                timeout=httpx.Timeout(2.0, connect=1.0)
+            )
+            return response.status_code == 200
+        except Exception:
+            return False
 
-        Fetches current profile data to properly merge multiple subscriptions.
+    def _resolve_profile(self, email: str) -> Tuple[Optional[str], List[dict]]:
+        """
+        Resolve profile ID and its current bis_similar_products array.
 
         Args:
-            profile_id: Klaviyo profile ID
+            email: User email
 
         Returns:
-            List of existing similar product entries
+            (profile_id, bis_similar_products) - (None, []) if profile not found
+
+        Raises:
+            KlaviyoAPIError: If API request fails
         """
-        try:
-            url = f"{self.BASE_URL}/profiles/{profile_id}/"
-            params = {
-                "additional-fields[profile]": "properties"
+        self._wait_for_pending_imports([email])
+        return self._resolve_profiles([email]).get(email, (None, []))
+
+    def _wait_for_pending_imports(self, emails: List[str]) -> None:
+        """
+        Wait until bulk import jobs touching emails have been applied.
+
+        GET /profile-bulk-import-jobs/{job_id}/
+
+        Args:
+            emails: User emails about to be read for a merge
+
+        Raises:
+            KlaviyoAPIError: If a job is still running after
+                BULK_IMPORT_WAIT_TIMEOUT or its status can't be read
+        """
+        with self._pending_imports_lock:
+            job_ids = {
+                self._pending_imports[email]
+                for email in emails if email in self._pending_imports
             }
+        if not job_ids:
+            return
+
+        deadline = time.monotonic() + self.BULK_IMPORT_WAIT_TIMEOUT
+        for job_id in job_ids:
+            while self._get_bulk_import_status(job_id) in self.BULK_IMPORT_PENDING_STATUSES:
+                if time.monotonic() >= deadline:
+                    raise KlaviyoAPIError(f"Bulk import job {job_id} is still running")
+                time.sleep(self.BULK_IMPORT_POLL_INTERVAL)
+
+            with self._pending_imports_lock:
+                for email in emails:
+                    if self._pending_imports.get(email) == job_id:
+                        del self._pending_imports[email]
+
+    def _get_bulk_import_status(self, job_id: str) -> str:
+        """
+        Get status of a bulk import job.
 
-            response = self.session.get(url, params=params, timeout=self.timeout)
+        Args:
+            job_id: Bulk import job ID
+
+        Returns:
+            Job status (queued, processing, complete, cancelled, ...)
+
+        Raises:
+            KlaviyoAPIError: If API request fails
+        """
+        try:
+            response = self.client.get(self._bulk_import_url + job_id + "/")
             response.raise_for_status()
 
-            data = response.json()
-            properties = data.get('data', {}).get('attributes', {}).get('properties', {})
-            existing = properties.get('bis_similar_products', [])
+            data = orjson.loads(response.content)
+            return data['data']['attributes']['status']
 
-            # Ensure it's a list
-            if isinstance(existing, list):
-                return existing
-            return []
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            raise KlaviyoAPIError(f"Failed to get bulk import job: {str(e)}")
 
-        except Exception:
-            # If GET fails, return empty array (fail gracefully)
-            return []
+    def _resolve_profiles(self, emails: List[str]) -> Dict[str, Tuple[str, List[dict]]]:
+        """
+        Resolve profile IDs and bis_similar_products arrays for many emails.
+
+        GET /profiles/?filter=any(email,[...])&fields[profile]=email,properties
+
+        Properties come back inline with the search, so no per-profile
+        GET is needed to read the existing array.
+
+        Args:
+            emails: User email addresses
+
+        Returns:
+            Dictionary mapping email -> (profile_id, bis_similar_products),
+            emails without profile omitted
+
+        Raises:
+            KlaviyoAPIError: If API request fails
+        """
+        profiles = {}
+        unique_emails = list(dict.fromkeys(emails))
+
+        try:
+            url = self._profiles_url
+            for start in range(0, len(unique_emails), self.PROFILE_FILTER_MAX_EMAILS):
+                chunk = unique_emails[start:start + self.PROFILE_FILTER_MAX_EMAILS]
+                # Klaviyo normalizes emails, so match results case-insensitively
+                requested = {email.lower(): email for email in chunk}
+
+                emails_filter = ",".join(_quote_filter_value(email) for email in chunk)
+                params = {
+                    "filter": f"any(email,[{emails_filter}])",
+                    "fields[profile]": "email,properties",
+                    "page[size]": self.PROFILE_FILTER_MAX_EMAILS
+                }
+
+                next_url = url
+                while next_url:
+                    response = self.client.get(next_url, params=params)
+                    response.raise_for_status()
+
+                    data = orjson.loads(response.content)
+                    for profile in data.get('data') or []:
+                        attributes = profile.get('attributes') or {}
+                        email = requested.get((attributes.get('email') or '').lower())
+                        if not email:
+                            continue
+
+                        existing = (attributes.get('properties') or {}).get('bis_similar_products')
+                        # Ensure it's a list
+                        if not isinstance(existing, list):
+                            existing = []
+
+                        profiles[email] = (profile['id'], existing)
+
+                    # Next page link already carries the query string
+                    next_url = (data.get('links') or {}).get('next')
+                    params = None
+
+            return profiles
+
+        except (httpx.HTTPError, ValueError) as e:
+            raise KlaviyoAPIError(f"Failed to get profile: {str(e)}")
@@ -3,19 +3,34 @@ Application configuration from environment variables.
 """
 
 import os
+from dataclasses import dataclass
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Application configuration from environment variables."""
+    """
+    Application configuration from environment variables.
+
+    Values are read once at import and never change, so the class is
+    frozen and slotted. Use the module-level CONFIG instance.
+    """
 
     # Klaviyo
     KLAVIYO_API_KEY: str = os.getenv('KLAVIYO_API_KEY', '')
     KLAVIYO_API_REVISION: str = os.getenv('KLAVIYO_API_REVISION', '2024-10-15')
+    # Coalesce profile updates into bulk import jobs (0 = disabled)
+    KLAVIYO_BATCH_WINDOW_MS: int = int(os.getenv('KLAVIYO_BATCH_WINDOW_MS', '0'))
+    # Flush a batch early once this many updates are queued
+    KLAVIYO_BATCH_MAX_SIZE: int = int(os.getenv('KLAVIYO_BATCH_MAX_SIZE', '50'))
+    # Respond to webhooks as soon as the update is queued (don't wait for the flush)
+    KLAVIYO_BATCH_ASYNC: bool = os.getenv('KLAVIYO_BATCH_ASYNC', 'false').lower() in ('1', 'true', 'yes')
 
     # E-commerce Platform
     ECOMMERCE_PLATFORM: str = os.getenv('ECOMMERCE_PLATFORM', 'prestashop')
     ECOMMERCE_URL: str = os.getenv('ECOMMERCE_URL', '')
     ECOMMERCE_API_KEY: str = os.getenv('ECOMMERCE_API_KEY', '')
+    # Reuse category listings for this many seconds (0 = disabled)
+    CATEGORY_CACHE_TTL: int = int(os.getenv('CATEGORY_CACHE_TTL', '60'))
 
     # Webhooks
     WEBHOOK_SECRET: str = os.getenv('WEBHOOK_SECRET', '')
@@ -23,13 +38,19 @@ class Config:
     # Application
     SIMILAR_PRODUCTS_LIMIT: int = int(os.getenv('SIMILAR_PRODUCTS_LIMIT', '6'))
     API_TIMEOUT: int = int(os.getenv('API_TIMEOUT', '10'))
+    # Below this many in-stock candidates names are compared without BM25
+    BM25_MIN_CORPUS: int = int(os.getenv('BM25_MIN_CORPUS', '15'))
+    # Reuse similar products found for a product for this many seconds (0 = disabled)
+    SIMILAR_PRODUCTS_CACHE_TTL: int = int(os.getenv('SIMILAR_PRODUCTS_CACHE_TTL', '300'))
+    # Enrich in background threads and answer webhooks with 202 Accepted
+    ENRICH_ASYNC: bool = os.getenv('ENRICH_ASYNC', 'false').lower() in ('1', 'true', 'yes')
+    ENRICH_WORKERS: int = int(os.getenv('ENRICH_WORKERS', '4'))
 
     # Logging
     LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE: str = os.getenv('LOG_FILE', '/tmp/klaviyo_similar_products.log')
 
-    @classmethod
-    def validate(cls) -> None:
+    def validate(self) -> None:
         """
         Validate required configuration on startup.
 
@@ -43,9 +64,13 @@ class Config:
             'WEBHOOK_SECRET'
         ]
 
-        missing = [key for key in required if not getattr(cls, key)]
+        missing = [key for key in required if not getattr(self, key)]
 
         if missing:
             raise ValueError(
                 f"Missing required environment variables: {', '.join(missing)}"
             )
+
+
+# Process-wide configuration
+CONFIG = Config()
@@ -20,7 +20,10 @@ Stock is not scored - products are pre-filtered for quantity > 0.
 
 import re
 import math
-from typing import Set, List, Dict
+import numpy as np
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import FrozenSet, List, Dict, Optional, Tuple
 from collections import Counter
 from app.adapters.base import Product
 
@@ -34,17 +37,201 @@ STOP_WORDS = {
     'i', 'na', 'do', 'z', 'w', 'o', 'dla', 'po', 'ze', 'od'
 }
 
+# Quantities: 600g, 1kg, 250ml, 365g, etc.
+_QUANTITY_RE = re.compile(r'\d+\s?(g|kg|ml|l|mg|szt|pcs|oz|lb)(?:\s|$)')
+# Words (alphanumeric only)
+_WORD_RE = re.compile(r'\w+')
 
-def calculate_similarity_with_context(
-    original: Product,
-    candidate: Product,
-    all_products: List[Product]
-) -> float:
+# Price difference thresholds (upper bounds, inclusive) and their scores,
+# vectorized form of _calculate_price_similarity()
+_PRICE_BINS = np.array([0.20, 0.50])
+_PRICE_SCORES = np.array([1.0, 0.5, 0.2])
+
+# Postings of a term unknown to the corpus
+_NO_DOCS = np.empty(0, dtype=np.int32)
+
+
+@dataclass
+class InvertedIndex:
+    """
+    Term -> documents postings in CSR layout.
+
+    Postings are int32 arrays instead of per-term Python lists, so looking
+    up documents for a term is a slice, not a list walk.
+
+    Attributes:
+        term_ids: Term -> term number
+        indptr: Postings of term number i are indices[indptr[i]:indptr[i + 1]]
+        indices: Corpus document positions, grouped by term
+        lengths: Token count of every corpus document
+    """
+
+    term_ids: Dict[str, int]
+    indptr: np.ndarray
+    indices: np.ndarray
+    lengths: np.ndarray
+
+    def docs(self, term: str) -> np.ndarray:
+        """
+        Get corpus positions of documents containing term.
+
+        Args:
+            term: Token
+
+        Returns:
+            int32 array of document positions (empty if term unknown)
+        """
+        i = self.term_ids.get(term)
+        if i is None:
+            return _NO_DOCS
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+
+@dataclass
+class BM25Context:
+    """
+    BM25 corpus statistics for one category, shared by all candidate scorings.
+
+    Depends only on the corpus, not on the product being matched, so one
+    context serves every product of the category.
+
+    Attributes:
+        tokens_by_id: Product ID -> (primary name tokens, secondary name tokens)
+        idf_scores: Term -> BM25 IDF score over primary names
+        avgdl: Average primary name length
+        idf_scores_secondary: Term -> BM25 IDF score over secondary names
+        avgdl_secondary: Average secondary name length
+        doc_index: Product ID -> corpus position (document number in postings)
+        postings: Inverted index of primary names
+        postings_secondary: Inverted index of secondary names
+        length_norm: Document length -> BM25 length factor for primary names
+        length_norm_secondary: Same for secondary names
+    """
+
+    tokens_by_id: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]]
+    idf_scores: Dict[str, float]
+    avgdl: float
+    idf_scores_secondary: Dict[str, float]
+    avgdl_secondary: float
+    doc_index: Dict[str, int]
+    postings: InvertedIndex
+    postings_secondary: InvertedIndex
+    length_norm: np.ndarray
+    length_norm_secondary: np.ndarray
+
+    def tokens(self, product: Product) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """
+        Get (primary, secondary) name tokens for product.
+
+        Products outside the corpus use their own precomputed tokens.
+
+        Args:
+            product: Product to get tokens for
+
+        Returns:
+            Tuple of token sets (secondary is empty if no secondary name)
+        """
+        tokens = self.tokens_by_id.get(product.id)
+        if tokens is None:
+            tokens = _tokenize_product(product)
+        return tokens
+
+    def doc_positions(self, products: List[Product]) -> Optional[np.ndarray]:
+        """
+        Get corpus positions of products.
+
+        Args:
+            products: Products to look up
+
+        Returns:
+            int32 array of positions, or None if some product is outside the
+            corpus or listed twice (postings can't address it)
+        """
+        positions = [self.doc_index.get(p.id, -1) for p in products]
+        if -1 in positions or len(set(positions)) != len(positions):
+            return None
+        return np.array(positions, dtype=np.int32)
+
+
+def build_bm25_context(original: Product, all_products: List[Product]) -> BM25Context:
+    """
+    Tokenize category corpus and compute BM25 IDF once per request.
+
+    Corpus is the original product plus all products in category, see
+    build_corpus_context().
+
+    Args:
+        original: Product user subscribed to
+        all_products: All products in category (used for BM25 IDF calculation)
+
+    Returns:
+        BM25Context reused by score_candidate() for every candidate
+    """
+    return build_corpus_context([original, *all_products])
+
+
+def build_corpus_context(products: List[Product]) -> BM25Context:
+    """
+    Tokenize corpus and compute BM25 IDF and postings.
+
+    Each name language gets its own IDF table, so terms are weighted
+    against names in the same language and neither table is diluted by
+    the other vocabulary. Nothing here depends on the query product.
+
+    Args:
+        products: Corpus documents (duplicate IDs are indexed once)
+
+    Returns:
+        BM25Context for scoring any product against the corpus
+    """
+    # Build corpus, tokenizing each product once
+    tokens_by_id = {}
+    documents = []
+    documents_secondary = []
+    for p in products:
+        if p.id in tokens_by_id:  # Skip if already added
+            continue
+        primary, secondary = tokens_by_id[p.id] = _tokenize_product(p)
+        documents.append(primary)
+        # Add secondary language if available
+        if p.name_secondary:
+            documents_secondary.append(secondary)
+
+    # Calculate BM25 IDF scores and average document length per language
+    idf_scores = _calculate_bm25_idf(documents)
+    avgdl = _average_length(documents)
+    idf_scores_secondary = _calculate_bm25_idf(documents_secondary)
+    avgdl_secondary = _average_length(documents_secondary)
+
+    # Postings share document positions across languages (products without
+    # secondary name are empty documents there)
+    doc_index = {product_id: i for i, product_id in enumerate(tokens_by_id)}
+    postings = _build_inverted_index([primary for primary, _ in tokens_by_id.values()])
+    postings_secondary = _build_inverted_index([secondary for _, secondary in tokens_by_id.values()])
+
+    # Name lengths are small integers - precompute the length factor per length
+    max_length = int(max(postings.lengths.max(), postings_secondary.lengths.max()))
+
+    return BM25Context(
+        tokens_by_id=tokens_by_id,
+        idf_scores=idf_scores,
+        avgdl=avgdl,
+        idf_scores_secondary=idf_scores_secondary,
+        avgdl_secondary=avgdl_secondary,
+        doc_index=doc_index,
+        postings=postings,
+        postings_secondary=postings_secondary,
+        length_norm=_length_norm_table(avgdl, max_length),
+        length_norm_secondary=_length_norm_table(avgdl_secondary, max_length)
+    )
+
+
+def score_candidate(original: Product, candidate: Product, context: BM25Context) -> float:
     """
     Calculate comprehensive similarity score between two products using BM25.
 
     This is the main scoring function combining multiple factors:
-    - 60% Name similarity (BM25 with context from all_products corpus)
+    - 60% Name similarity (BM25 with context from the category corpus)
     - 30% Price proximity (similar price point = similar product segment)
     - 10% Manufacturer match (nice bonus, but not decisive)
 
@@ -58,7 +245,7 @@ def calculate_similarity_with_context(
     Args:
         original: Product user subscribed to (out of stock)
         candidate: Potential substitute product (in stock)
-        all_products: All products in category (used for BM25 IDF calculation)
+        context: Corpus statistics from build_bm25_context()
 
     Returns:
         Similarity score (0.0 - 1.0), where 1.0 = perfect substitute
@@ -66,9 +253,7 @@ def calculate_similarity_with_context(
     score = 0.0
 
     # 1. NAME SIMILARITY (60%) - MOST IMPORTANT
-    name_sim = _calculate_name_similarity_with_context(
-        original, candidate, all_products
-    )
+    name_sim = _calculate_name_similarity_with_context(original, candidate, context)
     score += name_sim * 0.60
 
     # 2. PRICE SIMILARITY (30%)
@@ -84,64 +269,200 @@ def calculate_similarity_with_context(
     return score
 
 
-def _calculate_name_similarity_with_context(
+def score_candidates(
+    original: Product,
+    candidates: List[Product],
+    context: BM25Context
+) -> np.ndarray:
+    """
+    Calculate similarity scores for all candidates at once.
+
+    Same scoring as score_candidate(), but BM25 name similarity is computed
+    for the whole candidate list with NumPy array ops instead of a Python
+    loop per candidate and query term.
+
+    Args:
+        original: Product user subscribed to (out of stock)
+        candidates: Potential substitute products (in stock)
+        context: Corpus statistics from build_bm25_context()
+
+    Returns:
+        Array of similarity scores (0.0 - 1.0), aligned with candidates
+    """
+    orig_tokens, orig_tokens_sec = context.tokens(original)
+
+    # Per-language corpus statistics: (postings, IDF, avgdl, length factor table)
+    languages = (
+        (context.postings, context.idf_scores, context.avgdl, context.length_norm),
+        (
+            context.postings_secondary, context.idf_scores_secondary,
+            context.avgdl_secondary, context.length_norm_secondary
+        ),
+    )
+
+    # Candidates are normally part of the corpus - score them straight from
+    # the inverted index, otherwise fall back to their token sets
+    cand_docs = context.doc_positions(candidates)
+    if cand_docs is not None:
+        # Corpus position -> candidate row (-1 for non-candidates)
+        doc_rows = np.full(len(context.doc_index), -1, dtype=np.int32)
+        doc_rows[cand_docs] = np.arange(len(candidates), dtype=np.int32)
+
+        def name_scores(query_tokens, language):
+            postings, idf_scores, _, length_norm = languages[language]
+            return _calculate_bm25_scores_indexed(
+                query_tokens, postings, cand_docs, doc_rows, idf_scores, length_norm
+            )
+    else:
+        cand_tokens = [context.tokens(c) for c in candidates]
+
+        def name_scores(query_tokens, language):
+            _, idf_scores, avgdl, _ = languages[language]
+            return _calculate_bm25_scores(
+                query_tokens, [tokens[language] for tokens in cand_tokens], idf_scores, avgdl
+            )
+
+    # 1. NAME SIMILARITY (60%) - best of primary and secondary language
+    name_sim = name_scores(orig_tokens, 0)
+    if original.name_secondary:
+        has_secondary = np.array([bool(c.name_secondary) for c in candidates], dtype=bool)
+        if has_secondary.any():
+            name_sim_sec = name_scores(orig_tokens_sec, 1)
+            name_sim = np.where(has_secondary, np.maximum(name_sim, name_sim_sec), name_sim)
+
+    return name_sim * 0.60 + _attribute_scores(original, candidates)
+
+
+def score_candidates_jaccard(original: Product, candidates: List[Product]) -> np.ndarray:
+    """
+    Calculate similarity scores without BM25, for small candidate pools.
+
+    With only a handful of documents IDF carries no real signal, so name
+    similarity is plain token overlap (Jaccard) and no corpus is built.
+    Price and manufacturer are scored as in score_candidates().
+
+    Args:
+        original: Product user subscribed to (out of stock)
+        candidates: Potential substitute products (in stock)
+
+    Returns:
+        Array of similarity scores (0.0 - 1.0), aligned with candidates
+    """
+    orig_tokens, orig_tokens_sec = _tokenize_product(original)
+
+    name_sim = np.zeros(len(candidates))
+    for i, candidate in enumerate(candidates):
+        cand_tokens, cand_tokens_sec = _tokenize_product(candidate)
+        similarity = _calculate_jaccard(orig_tokens, cand_tokens)
+        # Try secondary language if available, take best match
+        if original.name_secondary and candidate.name_secondary:
+            similarity = max(similarity, _calculate_jaccard(orig_tokens_sec, cand_tokens_sec))
+        name_sim[i] = similarity
+
+    return name_sim * 0.60 + _attribute_scores(original, candidates)
+
+
+def _attribute_scores(original: Product, candidates: List[Product]) -> np.ndarray:
+    """
+    Calculate price and manufacturer part of similarity for all candidates.
+
+    Args:
+        original: Product user subscribed to
+        candidates: Candidate products
+
+    Returns:
+        Array of weighted price + manufacturer scores (0.0 - 0.4)
+    """
+    scores = np.zeros(len(candidates))
+
+    # 2. PRICE SIMILARITY (30%) - thresholds of _calculate_price_similarity()
+    if original.price and original.price > 0:
+        cand_prices = np.array([c.price or 0.0 for c in candidates], dtype=float)
+        price_diff_pct = np.abs(original.price - cand_prices) / original.price
+        price_sim = _PRICE_SCORES[np.digitize(price_diff_pct, _PRICE_BINS, right=True)]
+        scores += 0.30 * np.where(cand_prices != 0.0, price_sim, 0.0)
+
+    # 3. MANUFACTURER MATCH (10%) - Nice bonus
+    if original.manufacturer_name:
+        manufacturer = original.manufacturer_name.lower()
+        scores += 0.10 * np.array([
+            bool(c.manufacturer_name) and c.manufacturer_name.lower() == manufacturer
+            for c in candidates
+        ])
+
+    return scores
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Get indices of the k highest scores, best first.
+
+    Category corpora are small (CATEGORY_FETCH_LIMIT), so a single stable
+    sort beats partitioning first. Equal scores keep input order.
+
+    Args:
+        scores: Similarity scores
+        k: Number of indices to return
+
+    Returns:
+        Array of at most k indices into scores
+    """
+    return np.argsort(-scores, kind='stable')[:max(k, 0)]
+
+
+def calculate_similarity_with_context(
     original: Product,
     candidate: Product,
     all_products: List[Product]
+) -> float:
+    """
+    Calculate similarity score for a single candidate.
+
+    Builds the BM25 context on every call - when scoring many candidates
+    use build_bm25_context() once and score_candidate() instead.
+
+    Args:
+        original: Product user subscribed to (out of stock)
+        candidate: Potential substitute product (in stock)
+        all_products: All products in category (used for BM25 IDF calculation)
+
+    Returns:
+        Similarity score (0.0 - 1.0), where 1.0 = perfect substitute
+    """
+    return score_candidate(original, candidate, build_bm25_context(original, all_products))
+
+
+def _calculate_name_similarity_with_context(
+    original: Product,
+    candidate: Product,
+    context: BM25Context
 ) -> float:
     """
     Calculate name similarity using BM25 algorithm with full corpus context.
 
-    Uses all products in the category to calculate proper IDF (Inverse Document
-    Frequency) scores, giving more weight to unique/rare words.
+    Uses precomputed IDF (Inverse Document Frequency) scores from all products
+    in the category, giving more weight to unique/rare words.
 
     Args:
         original: Product user subscribed to
         candidate: Candidate product
-        all_products: All products in category (for IDF calculation)
+        context: Corpus statistics from build_bm25_context()
 
     Returns:
         BM25 similarity score (0.0 - 1.0), normalized
     """
-    # Build corpus from all products (including original)
-    documents = []
-
-    # Add original product to corpus
-    orig_tokens_corpus = _tokenize_product_name(original.name)
-    documents.append(orig_tokens_corpus)
-    if original.name_secondary:
-        documents.append(_tokenize_product_name(original.name_secondary))
-
-    # Add all candidates
-    for p in all_products:
-        if p.id == original.id:  # Skip if already added
-            continue
-        tokens = _tokenize_product_name(p.name)
-        documents.append(tokens)
-        # Add secondary language if available
-        if p.name_secondary:
-            tokens_secondary = _tokenize_product_name(p.name_secondary)
-            documents.append(tokens_secondary)
-
-    # Calculate BM25 IDF scores and average document length
-    idf_scores = _calculate_bm25_idf(documents)
-    avgdl = sum(len(doc) for doc in documents) / len(documents) if documents else 1.0
+    orig_tokens, orig_tokens_sec = context.tokens(original)
+    cand_tokens, cand_tokens_sec = context.tokens(candidate)
 
     # Calculate BM25 score for primary language
-    orig_tokens = _tokenize_product_name(original.name)
-    cand_tokens = _tokenize_product_name(candidate.name)
-
     similarity_primary = _calculate_bm25_score(
-        orig_tokens, cand_tokens, idf_scores, avgdl
+        orig_tokens, cand_tokens, context.idf_scores, context.avgdl
     )
 
     # Try secondary language if available
     if original.name_secondary and candidate.name_secondary:
-        orig_tokens_sec = _tokenize_product_name(original.name_secondary)
-        cand_tokens_sec = _tokenize_product_name(candidate.name_secondary)
-
         similarity_secondary = _calculate_bm25_score(
-            orig_tokens_sec, cand_tokens_sec, idf_scores, avgdl
+            orig_tokens_sec, cand_tokens_sec, context.idf_scores_secondary, context.avgdl_secondary
         )
 
         # Take best match
@@ -150,36 +471,84 @@ def _calculate_name_similarity_with_context(
     return similarity_primary
 
 
-def _tokenize_product_name(name: str) -> Set[str]:
+def _tokenize_product(product: Product) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Get product's primary and secondary name tokens.
+
+    Tokens are computed when Product is created, see Product.__post_init__.
+
+    Args:
+        product: Product to get tokens for
+
+    Returns:
+        Tuple of (primary tokens, secondary tokens)
+    """
+    return product.tokens_primary, product.tokens_secondary
+
+
+@lru_cache(maxsize=4096)
+def _tokenize_product_name(name: Optional[str]) -> FrozenSet[str]:
     """
     Tokenize product name into meaningful keywords.
 
+    Memoized by name - the same names are tokenized on every request for
+    the category. Returns frozenset so cached results can't be mutated.
+
     Removes:
     - Quantities (600g, 250ml, 1kg)
     - Stop words
     - Short words (<3 chars)
     """
     if not name:
-        return set()
+        return frozenset()
 
     # Lowercase
     text = name.lower()
 
     # Remove quantities: 600g, 1kg, 250ml, 365g, etc.
-    text = re.sub(r'\d+\s?(g|kg|ml|l|mg|szt|pcs|oz|lb)(?:\s|$)', ' ', text)
+    text = _QUANTITY_RE.sub(' ', text)
 
     # Extract words (alphanumeric only)
-    words = re.findall(r'\w+', text)
+    words = _WORD_RE.findall(text)
 
     # Filter: remove stop words and short words
-    tokens = {
+    tokens = frozenset(
         word for word in words
         if word not in STOP_WORDS and len(word) >= 3
-    }
+    )
 
     return tokens
 
 
+def _calculate_jaccard(tokens1: FrozenSet[str], tokens2: FrozenSet[str]) -> float:
+    """
+    Calculate Jaccard similarity of two token sets.
+
+    Args:
+        tokens1: First token set
+        tokens2: Second token set
+
+    Returns:
+        |intersection| / |union| (0.0 if both are empty)
+    """
+    shared = len(tokens1 & tokens2)
+    union = len(tokens1) + len(tokens2) - shared
+    return shared / union if union else 0.0
+
+
+def _average_length(documents: List[FrozenSet[str]]) -> float:
+    """
+    Calculate average document length for BM25 length normalization.
+
+    Args:
+        documents: List of tokenized documents
+
+    Returns:
+        Average number of tokens per document (1.0 for empty corpus)
+    """
+    return sum(len(doc) for doc in documents) / len(documents) if documents else 1.0
+
+
 def _calculate_price_similarity(price1: float, price2: float) -> float:
     """
     Calculate price similarity using threshold-based scoring.
@@ -199,7 +568,7 @@ def _calculate_price_similarity(price1: float, price2: float) -> float:
         return 0.2
 
 
-def _calculate_bm25_idf(documents: List[Set[str]]) -> Dict[str, float]:
+def _calculate_bm25_idf(documents: List[FrozenSet[str]]) -> Dict[str, float]:
     """
     Calculate BM25 IDF (Inverse Document Frequency) for all terms in corpus.
 
@@ -217,7 +586,7 @@ def _calculate_bm25_idf(documents: List[Set[str]]) -> Dict[str, float]:
     Low IDF = common word (e.g., "gluten-free", "mix")
 
     Args:
-        documents: List of tokenized documents (sets of words)
+        documents: List of tokenized documents (frozensets of words)
 
     Returns:
         Dictionary mapping term -> BM25 IDF score
@@ -243,8 +612,8 @@ def _calculate_bm25_idf(documents: List[Set[str]]) -> Dict[str, float]:
 
 
 def _calculate_bm25_score(
-    query_tokens: Set[str],
-    doc_tokens: Set[str],
+    query_tokens: FrozenSet[str],
+    doc_tokens: FrozenSet[str],
     idf_scores: Dict[str, float],
     avgdl: float,
     k1: float = 1.5,
@@ -285,33 +654,207 @@ def _calculate_bm25_score(
 
     score = 0.0
     doc_length = len(doc_tokens)
+    length_factor = 1.0 - b + b * (doc_length / avgdl)
 
-    # Calculate BM25 score for each query term
-    for term in query_tokens:
+    # Calculate BM25 score for each query term present in doc. Binary term
+    # frequency means only the intersection contributes - it's built by
+    # probing the smaller set, without walking every query term.
+    for term in query_tokens & doc_tokens:
         if term not in idf_scores:
             continue
 
-        # Binary term frequency (1 if present in doc, 0 if not)
-        tf = 1.0 if term in doc_tokens else 0.0
-
-        if tf == 0.0:
-            continue
+        tf = 1.0
 
         # BM25 component for this term
         idf = idf_scores[term]
         numerator = tf * (k1 + 1.0)
-        denominator = tf + k1 * (1.0 - b + b * (doc_length / avgdl))
+        denominator = tf + k1 * length_factor
 
         score += idf * (numerator / denominator)
 
     # Normalize score to 0.0-1.0 range
-    # Max possible score is when all query terms present in doc
-    max_score = 0.0
-    for term in query_tokens:
-        if term in idf_scores:
-            max_score += idf_scores[term] * ((k1 + 1.0) / (1.0 + k1 * (1.0 - b + b * (doc_length / avgdl))))
+    # Max possible score is when all query terms present in doc - only the
+    # length factor is candidate-specific, the IDF sum is fixed per query
+    sum_idf = sum(idf_scores[term] for term in query_tokens if term in idf_scores)
+    max_score = sum_idf * ((k1 + 1.0) / (1.0 + k1 * length_factor))
 
     if max_score > 0.0:
         score = score / max_score
 
     return min(score, 1.0)  # Clamp to max 1.0
+
+
+def _length_norm_table(avgdl: float, max_length: int, b: float = 0.75) -> np.ndarray:
+    """
+    Precompute BM25 length factor for every document length up to max_length.
+
+    Args:
+        avgdl: Average document length in corpus
+        max_length: Longest document in corpus
+        b: Length normalization strength (default 0.75)
+
+    Returns:
+        Array where entry L is 1 - b + b * (L / avgdl)
+    """
+    lengths = np.arange(max_length + 1, dtype=float)
+    return 1.0 - b + b * (lengths / (avgdl or 1.0))
+
+
+def _build_inverted_index(documents: List[FrozenSet[str]]) -> InvertedIndex:
+    """
+    Build CSR inverted index over token sets.
+
+    Args:
+        documents: Token sets, position in list is the document number
+
+    Returns:
+        InvertedIndex with int32 postings and document lengths
+    """
+    term_ids = {}
+    term_col = []
+    doc_col = []
+    for i, tokens in enumerate(documents):
+        for term in tokens:
+            term_col.append(term_ids.setdefault(term, len(term_ids)))
+            doc_col.append(i)
+
+    term_col = np.array(term_col, dtype=np.int32)
+    # Stable sort keeps documents ascending within each term
+    order = np.argsort(term_col, kind='stable')
+    indptr = np.zeros(len(term_ids) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(term_col, minlength=len(term_ids)), out=indptr[1:])
+
+    return InvertedIndex(
+        term_ids=term_ids,
+        indptr=indptr,
+        indices=np.array(doc_col, dtype=np.int32)[order],
+        lengths=np.array([len(tokens) for tokens in documents], dtype=np.int32)
+    )
+
+
+def _calculate_bm25_scores(
+    query_tokens: FrozenSet[str],
+    docs_tokens: List[FrozenSet[str]],
+    idf_scores: Dict[str, float],
+    avgdl: float,
+    k1: float = 1.5,
+    b: float = 0.75
+) -> np.ndarray:
+    """
+    Vectorized _calculate_bm25_score() for many documents.
+
+    Args:
+        query_tokens: Query product tokens (set of words)
+        docs_tokens: Token sets of candidate products
+        idf_scores: Pre-calculated BM25 IDF scores
+        avgdl: Average document length in corpus
+        k1: Term frequency saturation parameter (default 1.5)
+        b: Length normalization strength (default 0.75)
+
+    Returns:
+        Array of BM25 scores (0.0 - 1.0), normalized by max possible score
+    """
+    query_terms = [term for term in query_tokens if term in idf_scores]
+    column = {term: j for j, term in enumerate(query_terms)}
+
+    # Binary term frequency (1 if present in doc, 0 if not)
+    presence = np.zeros((len(docs_tokens), len(query_terms)))
+    for i, tokens in enumerate(docs_tokens):
+        for term in query_tokens & tokens:
+            if term in column:
+                presence[i, column[term]] = 1.0
+
+    doc_length = np.array([len(tokens) for tokens in docs_tokens], dtype=float)
+    length_factor = 1.0 - b + b * (doc_length / (avgdl or 1.0))
+    return _score_presence(presence, length_factor, query_terms, idf_scores, k1)
+
+
+def _calculate_bm25_scores_indexed(
+    query_tokens: FrozenSet[str],
+    index: InvertedIndex,
+    cand_docs: np.ndarray,
+    doc_rows: np.ndarray,
+    idf_scores: Dict[str, float],
+    length_norm: np.ndarray,
+    k1: float = 1.5
+) -> np.ndarray:
+    """
+    _calculate_bm25_scores() for candidates that are corpus documents.
+
+    Presence matrix and document lengths come straight from the inverted
+    index, without touching candidate token sets, and length factors are
+    looked up instead of computed.
+
+    Args:
+        query_tokens: Query product tokens (set of words)
+        index: Inverted index of the corpus
+        cand_docs: Corpus position of every candidate
+        doc_rows: Corpus position -> candidate row (-1 for non-candidates)
+        idf_scores: Pre-calculated BM25 IDF scores
+        length_norm: Document length -> length factor, from _length_norm_table()
+        k1: Term frequency saturation parameter (default 1.5)
+
+    Returns:
+        Array of BM25 scores (0.0 - 1.0), normalized by max possible score
+    """
+    query_terms = [term for term in query_tokens if term in idf_scores]
+
+    presence = np.zeros((cand_docs.size, len(query_terms)))
+    for j, term in enumerate(query_terms):
+        rows = doc_rows[index.docs(term)]
+        presence[rows[rows >= 0], j] = 1.0
+
+    length_factor = length_norm[index.lengths[cand_docs]]
+    return _score_presence(presence, length_factor, query_terms, idf_scores, k1)
+
+
+def _score_presence(
+    presence: np.ndarray,
+    length_factor: np.ndarray,
+    query_terms: List[str],
+    idf_scores: Dict[str, float],
+    k1: float
+) -> np.ndarray:
+    """
+    Score documents from (documents x query terms) binary presence matrix.
+
+    Documents sharing no query term score 0 and are skipped.
+
+    Args:
+        presence: Binary presence matrix, one column per query term
+        length_factor: BM25 length factor (1 - b + b * |D| / avgdl) of every document
+        query_terms: Query terms known to the corpus (presence columns)
+        idf_scores: Pre-calculated BM25 IDF scores
+        k1: Term frequency saturation parameter
+
+    Returns:
+        Array of BM25 scores (0.0 - 1.0), normalized by max possible score
+    """
+    scores = np.zeros(presence.shape[0])
+    if not query_terms or not presence.size:
+        return scores
+
+    # Only documents sharing at least one query term can score above 0
+    matched = np.flatnonzero(presence.any(axis=1))
+    if not matched.size:
+        return scores
+    presence = presence[matched]
+
+    idf_vec = np.array([idf_scores[term] for term in query_terms])
+    length_norm = k1 * length_factor[matched]
+
+    numerator = presence * (k1 + 1.0)
+    denominator = presence + length_norm[:, None]
+    raw_scores = (numerator / denominator) @ idf_vec
+
+    # Normalize score to 0.0-1.0 range
+    # Max possible score is when all query terms present in doc - the IDF
+    # sum is the same for every document, only the length factor varies
+    sum_idf = float(idf_vec.sum())
+    max_scores = sum_idf * ((k1 + 1.0) / (1.0 + length_norm))
+
+    matched_scores = np.zeros(matched.size)
+    np.divide(raw_scores, max_scores, out=matched_scores, where=max_scores > 0.0)
+    scores[matched] = np.minimum(matched_scores, 1.0)  # Clamp to max 1.0
+
+    return scores
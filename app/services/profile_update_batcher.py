@@ -0,0 +1,149 @@
+"""
+Coalesces Klaviyo profile updates into bulk import jobs.
+
+Enrichments arriving within a short window (default 100ms), or until
+max_batch_size updates are queued, are flushed together with a single
+KlaviyoClient.bulk_add_similar_products() call, turning N GET+PATCH
+round-trips into one POST. A profile already in an earlier, not yet
+applied job is merged only after that job completes, so repeat updates
+for one subscriber aren't lost.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Tuple
+from app.clients.klaviyo_client import KlaviyoClient, KlaviyoAPIError
+from app.utils.logger import get_logger, log_with_context, hash_email
+
+logger = get_logger(__name__)
+
+
+class ProfileUpdateBatcher:
+    """Background batcher for bis_similar_products profile updates."""
+
+    def __init__(
+        self,
+        klaviyo_client: KlaviyoClient,
+        window_ms: int = 100,
+        max_batch_size: int = 50
+    ):
+        """
+        Initialize batcher.
+
+        The flusher thread is started lazily on first submit, so the
+        batcher is safe to create before gunicorn forks workers.
+
+        Args:
+            klaviyo_client: Klaviyo API client
+            window_ms: How long to collect updates before flushing
+            max_batch_size: Flush as soon as this many updates are queued
+        """
+        self.klaviyo_client = klaviyo_client
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        email: str,
+        product_id: str,
+        similar_product_ids: List[str],
+        enriched_at: str
+    ) -> Future:
+        """
+        Queue similar products update for profile.
+
+        Args:
+            email: User email
+            product_id: Product user subscribed to
+            similar_product_ids: List of similar product IDs
+            enriched_at: ISO timestamp
+
+        Returns:
+            Future resolved with True once the batch is flushed, or with
+            KlaviyoAPIError if profile not found / bulk import failed
+        """
+        self._ensure_started()
+
+        future = Future()
+        self._queue.put(((email, product_id, similar_product_ids, enriched_at), future))
+        return future
+
+    def _ensure_started(self) -> None:
+        """Start flusher thread if not running (e.g. first use after fork)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="klaviyo-profile-batcher",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        """Collect queued updates for one window (or full batch), then flush them."""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[Tuple[str, str, List[str], str], Future]]) -> None:
+        """
+        Send batch as one bulk import and resolve its futures.
+
+        Args:
+            batch: Queued (entry, future) pairs
+        """
+        try:
+            included = self.klaviyo_client.bulk_add_similar_products(
+                [entry for entry, _ in batch]
+            )
+        except Exception as e:
+            log_with_context(
+                logger, "ERROR",
+                "Bulk profile update failed",
+                batch_size=len(batch),
+                error=str(e)
+            )
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        log_with_context(
+            logger, "INFO",
+            "Bulk profile update sent",
+            batch_size=len(batch)
+        )
+
+        for (email, product_id, _, _), future in batch:
+            if included.get(email):
+                future.set_result(True)
+            else:
+                # Logged here too - callers may not wait for the result
+                log_with_context(
+                    logger, "WARNING",
+                    "Profile not found for batched update",
+                    user_hash=hash_email(email),
+                    product_id=product_id
+                )
+                future.set_exception(
+                    KlaviyoAPIError(f"Profile not found for email: {email}")
+                )
@@ -2,12 +2,18 @@
 Core business logic for similar products recommendation.
 """
 
-from typing import List, Dict
-from datetime import datetime
+import logging
+import threading
+from cachetools import TTLCache
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from app.adapters.base import EcommerceAdapter, Product
 from app.clients.klaviyo_client import KlaviyoClient
-from app.services.product_similarity import calculate_similarity_with_context
-from app.utils.logger import get_logger, log_with_context, hash_email
+from app.services.profile_update_batcher import ProfileUpdateBatcher
+from app.services.product_similarity import (
+    BM25Context, build_corpus_context, score_candidates, score_candidates_jaccard, top_k_indices
+)
+from app.utils.logger import get_logger, log_with_context, hash_email, iso_now
 
 logger = get_logger(__name__)
 
@@ -22,11 +28,26 @@ class SimilarProductsService:
     3. Updating Klaviyo profiles with recommendations
     """
 
+    # Category products fetched per request (larger corpus = better BM25 IDF)
+    CATEGORY_FETCH_LIMIT = 100
+
+    # Maximum number of products with cached similar products results
+    SIMILAR_CACHE_SIZE = 10000
+
+    # BM25 corpus statistics kept per category listing state
+    BM25_CORPUS_CACHE_SIZE = 128
+    BM25_CORPUS_CACHE_TTL = 600  # seconds
+
     def __init__(
         self,
         ecommerce_adapter: EcommerceAdapter,
         klaviyo_client: KlaviyoClient,
-        limit: int = 6
+        limit: int = 6,
+        batcher: Optional[ProfileUpdateBatcher] = None,
+        wait_for_batch: bool = True,
+        enrich_workers: int = 4,
+        bm25_min_corpus: int = 15,
+        similar_cache_ttl: int = 300
     ):
         """
         Initialize service with clients.
@@ -35,17 +56,48 @@ class SimilarProductsService:
             ecommerce_adapter: E-commerce platform adapter
             klaviyo_client: Klaviyo API client
             limit: Maximum number of similar products to return
+            batcher: If provided, profile updates are coalesced into
+                     Klaviyo bulk import jobs instead of single PATCHes
+            wait_for_batch: Wait until the batch carrying the update is sent.
+                            If False, enrich_profile() returns once the update
+                            is queued (failures are only logged by the batcher)
+            enrich_workers: Threads running enrichments queued with
+                            submit_enrichment()
+            bm25_min_corpus: Score names with BM25 only from this many
+                             in-stock candidates, plain token overlap below
+            similar_cache_ttl: Reuse similar products found for a product
+                               for this many seconds (0 = disabled)
         """
         self.ecommerce_adapter = ecommerce_adapter
         self.klaviyo_client = klaviyo_client
         self.limit = limit
+        self.batcher = batcher
+        self.wait_for_batch = wait_for_batch
+        self.enrich_workers = enrich_workers
+        self.bm25_min_corpus = bm25_min_corpus
+
+        # Created on first submit_enrichment(), see there
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        # product_id -> tuple of similar product IDs
+        self._similar_cache = None
+        if similar_cache_ttl > 0:
+            self._similar_cache = TTLCache(maxsize=self.SIMILAR_CACHE_SIZE, ttl=similar_cache_ttl)
+        self._similar_cache_lock = threading.Lock()
+
+        # (category_id, listing fingerprint) -> BM25Context
+        self._bm25_corpora = TTLCache(
+            maxsize=self.BM25_CORPUS_CACHE_SIZE, ttl=self.BM25_CORPUS_CACHE_TTL
+        )
+        self._bm25_corpora_lock = threading.Lock()
 
     def enrich_profile(self, email: str, product_id: str) -> Dict:
         """
         Main orchestration method: enrich profile with similar products.
 
         Steps:
-        1. Get original product from e-commerce platform
+        1. Get original product and its category from e-commerce platform
         2. Find similar products
         3. Update Klaviyo profile with product IDs
 
@@ -60,31 +112,42 @@ class SimilarProductsService:
                 "error": str or None
             }
         """
+        profile_future = None
         try:
-            # 1. Get original product
-            original_product = self.ecommerce_adapter.get_product(product_id)
-            if not original_product:
-                log_with_context(
-                    logger, "WARNING",
-                    "Product not found",
-                    product_id=product_id
+            # Reuse similar products found recently for this product (no fetch)
+            similar_product_ids = self._get_cached_similar(product_id)
+            if similar_product_ids is None:
+                # Resolve Klaviyo profile while products are fetched from e-commerce
+                if not self.batcher:
+                    profile_future = self.klaviyo_client.prefetch_profile(email)
+
+                # 1. Get original product together with its category products
+                original_product, category_products = self.ecommerce_adapter.get_product_with_siblings(
+                    product_id,
+                    limit=self.CATEGORY_FETCH_LIMIT
                 )
-                return {
-                    "success": False,
-                    "similar_count": 0,
-                    "error": "Product not found"
-                }
+                if not original_product:
+                    log_with_context(
+                        logger, "WARNING",
+                        "Product not found",
+                        product_id=product_id
+                    )
+                    return {
+                        "success": False,
+                        "similar_count": 0,
+                        "error": "Product not found"
+                    }
 
-            log_with_context(
-                logger, "INFO",
-                "Product found",
-                product_id=product_id,
-                product_name=original_product.name,
-                category_id=original_product.category_id
-            )
+                log_with_context(
+                    logger, "INFO",
+                    "Product found",
+                    product_id=product_id,
+                    product_name=original_product.name,
+                    category_id=original_product.category_id
+                )
 
-            # 2. Find similar products
-            similar_product_ids = self.find_similar_products(original_product)
+                # 2. Find similar products
+                similar_product_ids = self.find_similar_products(original_product, category_products)
 
             log_with_context(
                 logger, "INFO",
@@ -95,27 +158,39 @@ class SimilarProductsService:
 
             # 3. Update Klaviyo profile (only if we have similar products)
             if len(similar_product_ids) > 0:
-                self.klaviyo_client.add_similar_products(
-                    email=email,
-                    product_id=product_id,
-                    similar_product_ids=similar_product_ids,
-                    enriched_at=datetime.utcnow().isoformat() + "Z"
-                )
-
-                log_with_context(
-                    logger, "INFO",
-                    "Profile enriched successfully",
-                    user_hash=hash_email(email),
-                    product_id=product_id,
-                    similar_count=len(similar_product_ids)
-                )
+                enriched_at = iso_now()
+                if self.batcher:
+                    future = self.batcher.submit(
+                        email, product_id, similar_product_ids, enriched_at
+                    )
+                    if self.wait_for_batch:
+                        # Wait for the bulk import carrying this update
+                        future.result()
+                else:
+                    self.klaviyo_client.add_similar_products(
+                        email=email,
+                        product_id=product_id,
+                        similar_product_ids=similar_product_ids,
+                        enriched_at=enriched_at,
+                        prefetched=profile_future
+                    )
+
+                if logger.isEnabledFor(logging.INFO):
+                    log_with_context(
+                        logger, "INFO",
+                        "Profile enriched successfully",
+                        user_hash=hash_email(email),
+                        product_id=product_id,
+                        similar_count=len(similar_product_ids)
+                    )
             else:
-                log_with_context(
-                    logger, "INFO",
-                    "No similar products to add - skipping Klaviyo update",
-                    user_hash=hash_email(email),
-                    product_id=product_id
-                )
+                if logger.isEnabledFor(logging.INFO):
+                    log_with_context(
+                        logger, "INFO",
+                        "No similar products to add - skipping Klaviyo update",
+                        user_hash=hash_email(email),
+                        product_id=product_id
+                    )
 
             return {
                 "success": True,
@@ -137,15 +212,147 @@ class SimilarProductsService:
                 "error": str(e)
             }
 
-    def find_similar_products(self, original_product: Product) -> List[str]:
+        finally:
+            # Not consumed (product missing, nothing to add, error) - drop
+            # the lookup if it hasn't started yet
+            if profile_future is not None:
+                profile_future.cancel()
+
+    def enrich_profiles(self, pairs: List[Tuple[str, str]]) -> List[Dict]:
+        """
+        Enrich many profiles at once.
+
+        Each distinct product is fetched and scored once, however many
+        subscribers it has, and all profile updates are sent to Klaviyo
+        as one bulk import job instead of a GET+PATCH per profile.
+
+        Args:
+            pairs: List of (email, product_id) to enrich
+
+        Returns:
+            List of result dicts as returned by enrich_profile(), aligned with pairs
+        """
+        # 1. Fetch and score every distinct product once
+        similar_by_product: Dict[str, List[str]] = {}
+        errors: Dict[str, str] = {}
+        for product_id in dict.fromkeys(product_id for _, product_id in pairs):
+            cached = self._get_cached_similar(product_id)
+            if cached is not None:
+                similar_by_product[product_id] = cached
+                continue
+
+            try:
+                original_product, category_products = self.ecommerce_adapter.get_product_with_siblings(
+                    product_id,
+                    limit=self.CATEGORY_FETCH_LIMIT
+                )
+            except Exception as e:
+                log_with_context(
+                    logger, "ERROR",
+                    "Error fetching product for batch enrichment",
+                    product_id=product_id,
+                    error=str(e)
+                )
+                errors[product_id] = str(e)
+                continue
+
+            if not original_product:
+                errors[product_id] = "Product not found"
+                continue
+
+            similar_by_product[product_id] = self.find_similar_products(original_product, category_products)
+
+        # 2. Send all profile updates as one bulk import
+        enriched_at = iso_now()
+        entries = [
+            (email, product_id, similar_by_product[product_id], enriched_at)
+            for email, product_id in pairs
+            if similar_by_product.get(product_id)
+        ]
+
+        included: Dict[str, bool] = {}
+        bulk_error = None
+        if entries:
+            try:
+                included = self.klaviyo_client.bulk_add_similar_products(entries)
+            except Exception as e:
+                log_with_context(
+                    logger, "ERROR",
+                    "Bulk profile enrichment failed",
+                    batch_size=len(entries),
+                    error=str(e)
+                )
+                bulk_error = str(e)
+
+        log_with_context(
+            logger, "INFO",
+            "Batch enrichment finished",
+            pairs=len(pairs),
+            products=len(similar_by_product),
+            updates=len(entries)
+        )
+
+        # 3. Report per pair, in the shape of enrich_profile()
+        results = []
+        for email, product_id in pairs:
+            similar_count = len(similar_by_product.get(product_id, ()))
+            if product_id in errors:
+                error = errors[product_id]
+            elif not similar_count:
+                error = None
+            elif bulk_error:
+                error = bulk_error
+            elif not included.get(email):
+                error = f"Profile not found for email: {email}"
+            else:
+                error = None
+
+            results.append({
+                "success": error is None,
+                "similar_count": similar_count if error is None else 0,
+                "error": error
+            })
+
+        return results
+
+    def submit_enrichment(self, email: str, product_id: str) -> Future:
+        """
+        Run enrich_profile() in background, off the webhook request path.
+
+        Executor is created on first use, so it's never inherited from
+        the master process by forked gunicorn workers.
+
+        Args:
+            email: User email address
+            product_id: Product ID user subscribed to
+
+        Returns:
+            Future resolving to enrich_profile() result dict
+        """
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.enrich_workers,
+                        thread_name_prefix="enrich"
+                    )
+
+        return self._executor.submit(self.enrich_profile, email, product_id)
+
+    def find_similar_products(
+        self,
+        original_product: Product,
+        category_products: Optional[List[Product]] = None
+    ) -> List[str]:
         """
         Find similar products and return their IDs using intelligent scoring.
 
         Algorithm:
-        1. Fetch products from same category (limit 100 for better BM25 IDF)
+        1. Fetch products from same category, unless given (limit 100 for better BM25 IDF)
         2. Filter: exclude original, only in-stock products (quantity > 0)
         3. Score each candidate using multi-factor algorithm:
-           - 60% Name similarity (BM25 with saturation + length normalization)
+           - 60% Name similarity (BM25 with saturation + length normalization,
+             token overlap for pools smaller than bm25_min_corpus)
            - 30% Price proximity (similar price point)
            - 10% Manufacturer match (nice bonus)
         4. Sort by score descending
@@ -155,16 +362,24 @@ class SimilarProductsService:
 
         Args:
             original_product: The product user subscribed to
+            category_products: Products already fetched from the category
+                               (fetched here if None)
 
         Returns:
             List of product IDs (strings), max self.limit items
         """
+        cached = self._get_cached_similar(original_product.id)
+        if cached is not None:
+            return cached
+
         try:
             # Fetch candidates from same category (larger corpus = better BM25 IDF)
-            candidates = self.ecommerce_adapter.get_products_by_category(
-                original_product.category_id,
-                limit=100
-            )
+            if category_products is None:
+                category_products = self.ecommerce_adapter.get_products_by_category(
+                    original_product.category_id,
+                    limit=self.CATEGORY_FETCH_LIMIT
+                )
+            candidates = category_products
 
             log_with_context(
                 logger, "INFO",
@@ -196,38 +411,42 @@ class SimilarProductsService:
                 in_stock_count=len(candidates)
             )
 
-            # Score each candidate using comprehensive similarity algorithm
-            scored = []
-            for candidate in candidates:
-                score = calculate_similarity_with_context(
-                    original_product,
-                    candidate,
-                    all_products=candidates  # Full corpus for BM25 IDF calculation
-                )
-                scored.append((score, candidate))
+            if len(candidates) < self.bm25_min_corpus:
+                # Too few documents for meaningful IDF - skip building the corpus
+                scores = score_candidates_jaccard(original_product, candidates)
+            else:
+                # BM25 corpus is the whole category listing, shared by every
+                # product in the category - only the query side is per request
+                context = self._get_bm25_context(original_product.category_id, category_products)
+
+                # Score all candidates in one vectorized pass
+                scores = score_candidates(original_product, candidates, context)
 
-            # Sort by score descending
-            scored.sort(key=lambda x: x[0], reverse=True)
+            # Rank by score, best first
+            ranked = top_k_indices(scores, max(self.limit, 3)).tolist()
+            top = ranked[:self.limit]
 
             # Log top matches for debugging
-            if scored:
-                top_3 = scored[:3]
+            if logger.isEnabledFor(logging.INFO):
+                top_3 = ranked[:3]
                 log_with_context(
                     logger, "INFO",
                     "Top similar products",
                     product_id=original_product.id,
                     top_matches=[
                         {
-                            "id": p.id,
-                            "name": p.name[:50],
+                            "id": candidates[i].id,
+                            "name": candidates[i].name[:50],
                             "score": round(score, 3)
                         }
-                        for score, p in top_3
+                        for i, score in zip(top_3, scores[top_3].tolist())
                     ]
                 )
 
             # Return top N IDs
-            return [product.id for _, product in scored[:self.limit]]
+            similar_product_ids = [candidates[i].id for i in top]
+            self._cache_similar(original_product.id, similar_product_ids)
+            return similar_product_ids
 
         except Exception as e:
             log_with_context(
@@ -238,6 +457,68 @@ class SimilarProductsService:
             )
             return []
 
+    def _get_bm25_context(self, category_id: str, products: List[Product]) -> BM25Context:
+        """
+        Get BM25 corpus statistics for category listing, building them once.
+
+        Keyed by category and a fingerprint of the listing's IDs and names,
+        so products added, removed or renamed build a fresh context. Stock
+        changes don't - the corpus includes out-of-stock products.
+
+        Args:
+            category_id: Category of the listing
+            products: Category listing (corpus)
+
+        Returns:
+            BM25Context for the listing
+        """
+        fingerprint = hash(tuple(sorted(
+            (p.id, p.name, p.name_secondary or '') for p in products
+        )))
+        key = (category_id, fingerprint)
+
+        with self._bm25_corpora_lock:
+            context = self._bm25_corpora.get(key)
+
+        if context is None:
+            context = build_corpus_context(products)
+            with self._bm25_corpora_lock:
+                self._bm25_corpora[key] = context
+
+        return context
+
+    def _get_cached_similar(self, product_id: str) -> Optional[List[str]]:
+        """
+        Get similar products found for product within cache TTL.
+
+        Args:
+            product_id: The product user subscribed to
+
+        Returns:
+            List of product IDs (new list), or None if not cached
+        """
+        if self._similar_cache is None:
+            return None
+
+        with self._similar_cache_lock:
+            cached = self._similar_cache.get(product_id)
+
+        return list(cached) if cached is not None else None
+
+    def _cache_similar(self, product_id: str, similar_product_ids: List[str]) -> None:
+        """
+        Store similar products found for product.
+
+        Args:
+            product_id: The product user subscribed to
+            similar_product_ids: Ranked similar product IDs
+        """
+        if self._similar_cache is None:
+            return
+
+        with self._similar_cache_lock:
+            self._similar_cache[product_id] = tuple(similar_product_ids)
+
     def cleanup_profile(self, email: str, product_id: str = None) -> bool:
         """
         Remove similar products data from profile.
@@ -253,12 +534,13 @@ class SimilarProductsService:
         try:
             self.klaviyo_client.remove_similar_products(email, product_id)
 
-            log_with_context(
-                logger, "INFO",
-                "Profile cleaned up",
-                user_hash=hash_email(email),
-                product_id=product_id or "all"
-            )
+            if logger.isEnabledFor(logging.INFO):
+                log_with_context(
+                    logger, "INFO",
+                    "Profile cleaned up",
+                    user_hash=hash_email(email),
+                    product_id=product_id or "all"
+                )
 
             return True
 
@@ -4,11 +4,32 @@ Structured logging utilities with GDPR compliance.
 
 import logging
 import hashlib
-import json
-from datetime import datetime
+import time
+import orjson
+from datetime import datetime, timezone
 from typing import Any, Dict
 
 
+# Level names accepted by log_with_context()
+_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL
+}
+
+
+def iso_now() -> str:
+    """
+    Current UTC time as ISO 8601 string.
+
+    Returns:
+        Timestamp like "2025-10-30T12:34:56.123456Z"
+    """
+    return datetime.fromtimestamp(time.time(), tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
 def hash_email(email: str) -> str:
     """
     Hash email for GDPR-safe logging.
@@ -36,7 +57,8 @@ class JSONFormatter(logging.Formatter):
             JSON-formatted log string
         """
         log_data = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            # Record creation time, serialized natively by orjson
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage()
@@ -46,7 +68,13 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, 'extra_data'):
             log_data.update(record.extra_data)
 
-        return json.dumps(log_data)
+        # NumPy values, non-str keys and other objects (default=str)
+        # are serialized like json.dumps did instead of raising
+        return orjson.dumps(
+            log_data,
+            option=orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+            default=str
+        ).decode()
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -62,9 +90,9 @@ def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
 
     if not logger.handlers:
-        from app.config import Config
+        from app.config import CONFIG
 
-        logger.setLevel(getattr(logging, Config.LOG_LEVEL))
+        logger.setLevel(getattr(logging, CONFIG.LOG_LEVEL))
 
         # Console handler
         console = logging.StreamHandler()
@@ -72,8 +100,8 @@ def get_logger(name: str) -> logging.Logger:
         logger.addHandler(console)
 
         # File handler
-        if Config.LOG_FILE:
-            file_handler = logging.FileHandler(Config.LOG_FILE)
+        if CONFIG.LOG_FILE:
+            file_handler = logging.FileHandler(CONFIG.LOG_FILE)
             file_handler.setFormatter(JSONFormatter())
             logger.addHandler(file_handler)
 
@@ -89,12 +117,18 @@ def log_with_context(
     """
     Log message with structured context.
 
+    Returns early if level is disabled for logger. Callers building costly
+    context (hashing, list comprehensions) should check
+    logger.isEnabledFor() themselves before calling.
+
     Args:
         logger: Logger instance
         level: Log level (INFO, WARNING, ERROR)
         message: Log message
         **context: Additional context fields
     """
-    log_method = getattr(logger, level.lower())
-    extra = {"extra_data": context}
-    log_method(message, extra=extra)
+    level_no = _LEVELS.get(level.upper(), logging.INFO)
+    if not logger.isEnabledFor(level_no):
+        return
+
+    logger.log(level_no, message, extra={"extra_data": context})
@@ -3,7 +3,7 @@ Security and validation utilities.
 """
 
 import secrets
-from app.config import Config
+from app.config import CONFIG
 
 
 def validate_webhook_secret(provided_token: str) -> bool:
@@ -31,4 +31,4 @@ def validate_webhook_secret(provided_token: str) -> bool:
     if not provided_token:
         return False
 
-    return secrets.compare_digest(provided_token, Config.WEBHOOK_SECRET)
+    return secrets.compare_digest(provided_token, CONFIG.WEBHOOK_SECRET)
@@ -2,10 +2,11 @@
 Webhook endpoint for cleaning up profile data after email sent.
 """
 
+import logging
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from werkzeug.exceptions import BadRequest
 from app.utils.validators import validate_webhook_secret
-from app.utils.logger import get_logger, log_with_context, hash_email
+from app.utils.logger import get_logger, log_with_context, hash_email, iso_now
 
 bp = Blueprint('cleanup', __name__)
 logger = get_logger(__name__)
@@ -61,16 +62,17 @@ def cleanup_profile():
         success = service.cleanup_profile(email, product_id)
 
         if success:
-            log_with_context(
-                logger, "INFO",
-                "Profile cleaned up",
-                user_hash=hash_email(email),
-                product_id=product_id or "all"
-            )
+            if logger.isEnabledFor(logging.INFO):
+                log_with_context(
+                    logger, "INFO",
+                    "Profile cleaned up",
+                    user_hash=hash_email(email),
+                    product_id=product_id or "all"
+                )
 
             return jsonify({
                 "status": "success",
-                "timestamp": datetime.utcnow().isoformat() + "Z"
+                "timestamp": iso_now()
             }), 200
         else:
             log_with_context(
@@ -83,13 +85,17 @@ def cleanup_profile():
             return jsonify({
                 "status": "error",
                 "message": "Cleanup failed",
-                "timestamp": datetime.utcnow().isoformat() + "Z"
+                "timestamp": iso_now()
             }), 500
 
+    except BadRequest:
+        # Malformed JSON body
+        return jsonify({"status": "error", "message": "Invalid JSON"}), 400
+
     except Exception as e:
         logger.exception("Unexpected error in cleanup webhook")
         return jsonify({
             "status": "error",
             "message": "Internal server error",
-            "timestamp": datetime.utcnow().isoformat() + "Z"
+            "timestamp": iso_now()
         }), 500
@@ -2,14 +2,20 @@
 Webhook endpoint for profile enrichment with similar products.
 """
 
+import logging
+import time
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from werkzeug.exceptions import BadRequest
+from app.config import CONFIG
 from app.utils.validators import validate_webhook_secret
-from app.utils.logger import get_logger, log_with_context, hash_email
+from app.utils.logger import get_logger, log_with_context, hash_email, iso_now
 
 bp = Blueprint('enrich', __name__)
 logger = get_logger(__name__)
 
+# Maximum (email, ProductID) pairs per batch request
+MAX_BATCH_PROFILES = 1000
+
 
 @bp.route('/webhook/enrich', methods=['POST'])
 def enrich_profile():
@@ -31,8 +37,11 @@ def enrich_profile():
         "timestamp": "2025-10-30T12:34:56Z",
         "duration_ms": 850
     }
+
+    With ENRICH_ASYNC enabled, enrichment runs in background and the
+    response is 202 {"status": "accepted", "timestamp": ...}.
     """
-    start_time = datetime.utcnow()
+    start_time = time.perf_counter()
 
     try:
         # Validate webhook secret
@@ -63,26 +72,44 @@ def enrich_profile():
         from app import get_service
         service = get_service()
 
+        if CONFIG.ENRICH_ASYNC:
+            # Enrichment only has to happen soon, not before we respond
+            service.submit_enrichment(email, product_id)
+
+            if logger.isEnabledFor(logging.INFO):
+                log_with_context(
+                    logger, "INFO",
+                    "Profile enrichment queued",
+                    user_hash=hash_email(email),
+                    product_id=product_id
+                )
+
+            return jsonify({
+                "status": "accepted",
+                "timestamp": iso_now()
+            }), 202
+
         # Process enrichment
         result = service.enrich_profile(email, product_id)
 
         # Calculate duration
-        duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+        duration_ms = int((time.perf_counter() - start_time) * 1000)
 
         if result['success']:
-            log_with_context(
-                logger, "INFO",
-                "Profile enriched successfully",
-                user_hash=hash_email(email),
-                product_id=product_id,
-                similar_count=result['similar_count'],
-                duration_ms=duration_ms
-            )
+            if logger.isEnabledFor(logging.INFO):
+                log_with_context(
+                    logger, "INFO",
+                    "Profile enriched successfully",
+                    user_hash=hash_email(email),
+                    product_id=product_id,
+                    similar_count=result['similar_count'],
+                    duration_ms=duration_ms
+                )
 
             return jsonify({
                 "status": "success",
                 "similar_products_count": result['similar_count'],
-                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "timestamp": iso_now(),
                 "duration_ms": duration_ms
             }), 200
         else:
@@ -97,13 +124,124 @@ def enrich_profile():
             return jsonify({
                 "status": "error",
                 "message": result['error'],
-                "timestamp": datetime.utcnow().isoformat() + "Z"
+                "timestamp": iso_now()
             }), 500
 
+    except BadRequest:
+        # Malformed JSON body
+        return jsonify({"status": "error", "message": "Invalid JSON"}), 400
+
     except Exception as e:
         logger.exception("Unexpected error in enrich webhook")
         return jsonify({
             "status": "error",
             "message": "Internal server error",
-            "timestamp": datetime.utcnow().isoformat() + "Z"
+            "timestamp": iso_now()
+        }), 500
+
+
+@bp.route('/webhook/enrich/batch', methods=['POST'])
+def enrich_profiles():
+    """
+    Enrich many user profiles in one call (e.g. order event ingestion).
+
+    Each distinct product is scored once and all profile updates are sent
+    to Klaviyo as one bulk import job, see SimilarProductsService.enrich_profiles().
+
+    Expected payload:
+    {
+        "profiles": [
+            {"email": "user@example.com", "ProductID": "4422"},
+            ...
+        ]
+    }
+
+    Returns:
+    {
+        "status": "success",
+        "enriched_count": 2,
+        "results": [
+            {"email": "user@example.com", "ProductID": "4422",
+             "success": true, "similar_count": 6, "error": null},
+            ...
+        ],
+        "timestamp": "2025-10-30T12:34:56Z",
+        "duration_ms": 1200
+    }
+    """
+    start_time = time.perf_counter()
+
+    try:
+        # Validate webhook secret
+        token = request.headers.get('X-Webhook-Token')
+        if not validate_webhook_secret(token):
+            log_with_context(
+                logger, "WARNING",
+                "Unauthorized webhook attempt",
+                ip=request.remote_addr
+            )
+            return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+        # Parse request
+        data = request.json
+        profiles = data.get('profiles') if isinstance(data, dict) else None
+        if not profiles or not isinstance(profiles, list):
+            return jsonify({"status": "error", "message": "No profiles"}), 400
+
+        if len(profiles) > MAX_BATCH_PROFILES:
+            return jsonify({
+                "status": "error",
+                "message": f"Too many profiles (max {MAX_BATCH_PROFILES})"
+            }), 400
+
+        pairs = []
+        for item in profiles:
+            email = item.get('email') if isinstance(item, dict) else None
+            product_id = item.get('ProductID') if isinstance(item, dict) else None
+            if not email or not product_id:
+                return jsonify({
+                    "status": "error",
+                    "message": "Missing email or ProductID"
+                }), 400
+            pairs.append((email, product_id))
+
+        # Get service
+        from app import get_service
+        service = get_service()
+
+        results = service.enrich_profiles(pairs)
+
+        # Calculate duration
+        duration_ms = int((time.perf_counter() - start_time) * 1000)
+        enriched_count = sum(1 for result in results if result['success'])
+
+        log_with_context(
+            logger, "INFO",
+            "Batch enrichment processed",
+            pairs=len(pairs),
+            enriched_count=enriched_count,
+            duration_ms=duration_ms
+        )
+
+        return jsonify({
+            "status": "success",
+            "enriched_count": enriched_count,
+            "results": [
+                {"email": email, "ProductID": product_id, **result}
+                for (email, product_id), result in zip(pairs, results)
+            ],
+            "timestamp": iso_now(),
+            "duration_ms": duration_ms
+        }), 200
+
+    except BadRequest:
+        # Malformed JSON body
+        return jsonify({"status": "error", "message": "Invalid JSON"}), 400
+
+    except Exception as e:
+        logger.exception("Unexpected error in batch enrich webhook")
+        return jsonify({
+            "status": "error",
+            "message": "Internal server error",
+            "timestamp": iso_now()
         }), 500
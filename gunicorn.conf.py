@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for production.
+
+Webhooks spend most of their time waiting on PrestaShop and Klaviyo, so
+gevent workers are used: each process serves many webhooks concurrently
+while their HTTP calls are in flight, instead of one at a time.
+
+Run from the project root (picked up automatically):
+    gunicorn run:app
+"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Async workers - socket I/O (requests, httpx) yields to other webhooks
+worker_class = 'gevent'
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+# Concurrent webhooks per worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '500'))
+
+timeout = 60
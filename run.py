@@ -1,19 +1,55 @@
 """
 Application entry point.
+
+The Flask app is built on first access of run.app (gunicorn's run:app
+or __main__), so importing this module stays cheap.
 """
 
-from dotenv import load_dotenv
+import os
+import sys
+
+# Load environment variables from .env file in development only - in
+# production they come from the platform and dotenv is never imported
+if os.environ.get('APP_ENV', 'dev') == 'dev':
+    from dotenv import load_dotenv
+    load_dotenv()
+
 
-# Load environment variables from .env file
-load_dotenv()
+def _build_app():
+    """
+    Build Flask application.
 
-from app import create_app
-from app.utils.logger import get_logger
+    Returns:
+        Configured Flask app instance
+    """
+    from app import create_app
+    return create_app()
 
-logger = get_logger(__name__)
 
-app = create_app()
+def __getattr__(name):
+    """Build the app lazily when a WSGI server looks up run.app."""
+    if name == 'app':
+        globals()['app'] = application = _build_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    logger.info("Starting Flask application")
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    if os.environ.get('FLASK_DEV'):
+        # Werkzeug development server - local testing only
+        from app.utils.logger import get_logger
+
+        app = _build_app()
+        get_logger(__name__).info("Starting Flask development server")
+        app.run(host='0.0.0.0', port=5000, debug=False)
+    else:
+        # Production: gunicorn with gevent workers (see gunicorn.conf.py).
+        # Run by this interpreter from the project root, so the right
+        # virtualenv, config and run module are used from any directory
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        os.execv(sys.executable, [
+            sys.executable, '-m', 'gunicorn',
+            '--chdir', base_dir,
+            '-c', os.path.join(base_dir, 'gunicorn.conf.py'),
+            'run:app'
+        ])
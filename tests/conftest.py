@@ -2,24 +2,81 @@
 Pytest fixtures and test configuration.
 """
 
+import os
+import httpx
 import pytest
-from unittest.mock import Mock
+from unittest.mock import MagicMock
 from app.adapters.base import Product
-from app.adapters.prestashop import PrestaShopAdapter
 from app.clients.klaviyo_client import KlaviyoClient
 from app.services.similar_products_service import SimilarProductsService
 
 
+# Deterministic catalog for tests that need a realistic category size.
+# Built once at import - Product is immutable, so tests can share it.
+_POOL_WORDS = ("keto", "oat", "cookies", "bread", "chocolate", "gluten", "free", "vegan", "protein", "crackers")
+_PRODUCT_POOL = tuple(
+    Product(
+        id=str(i),
+        name=f"{_POOL_WORDS[i % 10].title()} {_POOL_WORDS[(i * 7 + 3) % 10].title()} {i:04d}",
+        category_id="5",
+        quantity=i % 20,
+        price=float(5 + i % 30)
+    )
+    for i in range(1000)
+)
+
+
+class FakeAdapter:
+    """E-commerce adapter stub - plain attributes, no Mock spec introspection."""
+
+    def __init__(self):
+        self.get_product = MagicMock()
+        self.get_products_by_category = MagicMock()
+        self.get_product_with_siblings = MagicMock()
+        self.health_check = MagicMock()
+
+
+class FakeKlaviyoClient:
+    """Klaviyo client stub - plain attributes, no Mock spec introspection."""
+
+    def __init__(self):
+        self.prefetch_profile = MagicMock()
+        self.add_similar_products = MagicMock()
+        self.bulk_add_similar_products = MagicMock()
+        self.remove_similar_products = MagicMock()
+        self.health_check = MagicMock()
+
+
 @pytest.fixture
 def mock_ecommerce_adapter():
     """Mock e-commerce adapter."""
-    return Mock(spec=PrestaShopAdapter)
+    return FakeAdapter()
 
 
 @pytest.fixture
 def mock_klaviyo_client():
     """Mock Klaviyo client."""
-    return Mock(spec=KlaviyoClient)
+    return FakeKlaviyoClient()
+
+
+@pytest.fixture(scope="session")
+def klaviyo_http_client():
+    """HTTP connection pool shared by all tests talking to Klaviyo."""
+    client = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=10)
+    )
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def real_klaviyo_client(klaviyo_http_client):
+    """Klaviyo client for integration tests (opt-in via KLAVIYO_TEST_API_KEY)."""
+    api_key = os.getenv('KLAVIYO_TEST_API_KEY')
+    if not api_key:
+        pytest.skip("KLAVIYO_TEST_API_KEY not set")
+    return KlaviyoClient(api_key, client=klaviyo_http_client)
 
 
 @pytest.fixture
@@ -32,9 +89,9 @@ def similar_products_service(mock_ecommerce_adapter, mock_klaviyo_client):
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_product():
-    """Sample product for testing."""
+    """Sample product for testing (shared by all tests, treat as read-only)."""
     return Product(
         id="4422",
         name="Gluten-Free Cookie Mix",
@@ -43,9 +100,15 @@ def sample_product():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def product_pool():
+    """Deterministic 1000-product category (every 20th product out of stock)."""
+    return _PRODUCT_POOL
+
+
+@pytest.fixture(scope="session")
 def sample_products():
-    """Sample list of products for testing."""
+    """Sample list of products for testing (shared by all tests, treat as read-only)."""
     return [
         Product(id="1", name="Gluten-Free Cookie Mix", category_id="5", quantity=10),
         Product(id="2", name="Gluten-Free Cake Mix", category_id="5", quantity=5),
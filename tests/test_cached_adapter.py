@@ -0,0 +1,45 @@
+"""
+Tests for caching e-commerce adapter.
+"""
+
+from unittest.mock import Mock
+from app.adapters.base import Product
+from app.adapters.cached import CachedEcommerceAdapter
+from app.adapters.prestashop import PrestaShopAdapter
+
+
+def test_category_listing_is_reused_within_ttl(sample_products):
+    """Test that repeated category requests hit the platform once."""
+    inner = Mock(spec=PrestaShopAdapter)
+    inner.get_products_by_category.return_value = sample_products
+    adapter = CachedEcommerceAdapter(inner, ttl=60)
+
+    first = adapter.get_products_by_category("5", limit=100)
+    first.append(Product(id="99", name="Added by caller", category_id="5"))
+    second = adapter.get_products_by_category("5", limit=100)
+
+    inner.get_products_by_category.assert_called_once_with("5", 100)
+    assert second == sample_products
+
+    adapter.get_products_by_category("6", limit=100)
+    assert inner.get_products_by_category.call_count == 2
+
+    adapter.cache_clear()
+    adapter.get_products_by_category("5", limit=100)
+    assert inner.get_products_by_category.call_count == 3
+
+
+def test_get_product_with_siblings_uses_cached_listing(sample_product, sample_products):
+    """Test that product + category lookup reuses the cached category listing."""
+    inner = Mock(spec=PrestaShopAdapter)
+    inner.get_product.return_value = sample_product
+    inner.get_products_by_category.return_value = sample_products
+    adapter = CachedEcommerceAdapter(inner, ttl=60)
+
+    adapter.get_product_with_siblings("4422", limit=100)
+    product, siblings = adapter.get_product_with_siblings("4422", limit=100)
+
+    assert product is sample_product
+    assert siblings == sample_products
+    assert inner.get_product.call_count == 2
+    inner.get_products_by_category.assert_called_once_with("5", 100)
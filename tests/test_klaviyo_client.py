@@ -0,0 +1,187 @@
+"""
+Tests for Klaviyo client.
+"""
+
+import orjson
+from unittest.mock import Mock
+from app.clients.klaviyo_client import KlaviyoClient
+
+
+def _response(data):
+    """Build mocked HTTP response returning given JSON data."""
+    response = Mock()
+    response.content = orjson.dumps(data)
+    return response
+
+
+def test_add_similar_products_rereads_array_before_merging():
+    """Test that each update merges with the array currently stored in Klaviyo."""
+    client = KlaviyoClient("pk_test")
+    client.client = Mock()
+    client.client.get.side_effect = [
+        _response({"data": [
+            {"id": "P1", "attributes": {"email": "test@example.com", "properties": {}}}
+        ]}),
+        # Another worker added product 7 in the meantime
+        _response({"data": [
+            {"id": "P1", "attributes": {"email": "test@example.com", "properties": {
+                "bis_similar_products": [
+                    {"product_id": "1", "similar_ids": ["2", "3"]},
+                    {"product_id": "7", "similar_ids": ["8"]}
+                ]
+            }}}
+        ]}),
+    ]
+
+    client.add_similar_products("test@example.com", "1", ["2", "3"], "2025-10-30T12:00:00Z")
+    client.add_similar_products("test@example.com", "4", ["5"], "2025-10-30T12:00:00Z")
+
+    assert client.client.get.call_count == 2
+    assert client.client.patch.call_count == 2
+
+    # Second update keeps the entry written by the other worker
+    payload = orjson.loads(client.client.patch.call_args[1]['content'])
+    stored = payload['data']['attributes']['properties']['bis_similar_products']
+    assert [item['product_id'] for item in stored] == ["1", "7", "4"]
+
+
+def test_add_similar_products_uses_prefetched_profile():
+    """Test that a prefetched profile is merged and patched without another GET."""
+    client = KlaviyoClient("pk_test")
+    client.client = Mock()
+    client.client.get.return_value = _response({"data": [
+        {"id": "P1", "attributes": {"email": "test@example.com", "properties": {
+            "bis_similar_products": [{"product_id": "7", "similar_ids": ["8"]}]
+        }}}
+    ]})
+
+    prefetched = client.prefetch_profile("test@example.com")
+    client.add_similar_products(
+        "test@example.com", "1", ["2"], "2025-10-30T12:00:00Z", prefetched=prefetched
+    )
+
+    client.client.get.assert_called_once()
+    payload = orjson.loads(client.client.patch.call_args[1]['content'])
+    stored = payload['data']['attributes']['properties']['bis_similar_products']
+    assert [item['product_id'] for item in stored] == ["7", "1"]
+
+
+def test_bulk_add_similar_products_single_import_job():
+    """Test that bulk update sends one job and skips unknown profiles."""
+    client = KlaviyoClient("pk_test")
+    client.client = Mock()
+    # c@example.com not found
+    client.client.get.return_value = _response({"data": [
+        {"id": "PA", "attributes": {"email": "a@example.com", "properties": {}}},
+        {"id": "PB", "attributes": {"email": "b@example.com", "properties": {
+            "bis_similar_products": [{"product_id": "1", "similar_ids": ["9"]}]
+        }}}
+    ]})
+    client.client.post.return_value = _response({"data": {"type": "profile-bulk-import-job", "id": "J1"}})
+
+    result = client.bulk_add_similar_products([
+        ("a@example.com", "1", ["2"], "2025-10-30T12:00:00Z"),
+        ("b@example.com", "1", ["3"], "2025-10-30T12:00:00Z"),
+        ("a@example.com", "4", ["5"], "2025-10-30T12:00:00Z"),
+        ("c@example.com", "1", ["2"], "2025-10-30T12:00:00Z"),
+    ])
+
+    assert result == {"a@example.com": True, "b@example.com": True, "c@example.com": False}
+    client.client.post.assert_called_once()
+
+    payload = orjson.loads(client.client.post.call_args[1]['content'])
+    profiles = payload['data']['attributes']['profiles']['data']
+    by_id = {p['id']: p['attributes']['properties']['bis_similar_products'] for p in profiles}
+    assert [item['product_id'] for item in by_id["PA"]] == ["1", "4"]
+    assert by_id["PB"][0]['similar_ids'] == ["3"]
+
+
+def test_get_profile_ids_by_emails_batches_and_paginates():
+    """Test that many emails are looked up with one filtered, paginated search."""
+    client = KlaviyoClient("pk_test")
+    client.client = Mock()
+    client.client.get.side_effect = [
+        _response({
+            "data": [{"id": "PA", "attributes": {"email": "a@example.com"}}],
+            "links": {"next": "https://a.klaviyo.com/api/profiles/?page[cursor]=abc"}
+        }),
+        _response({
+            "data": [{"id": "PB", "attributes": {"email": "b\"q@example.com"}}],
+            "links": {"next": None}
+        }),
+    ]
+
+    result = client.get_profile_ids_by_emails(["A@example.com", "b\"q@example.com", "c@example.com"])
+
+    assert result == {"A@example.com": "PA", "b\"q@example.com": "PB"}
+    assert client.client.get.call_count == 2
+
+    params = client.client.get.call_args_list[0][1]['params']
+    assert params['filter'] == 'any(email,["A@example.com","b\\"q@example.com","c@example.com"])'
+
+
+def test_add_similar_products_skips_unchanged():
+    """Test that re-enriching with same recommendations doesn't PATCH profile."""
+    client = KlaviyoClient("pk_test")
+    client.client = Mock()
+    client.client.get.return_value = _response({"data": [
+        {"id": "P1", "attributes": {"email": "test@example.com", "properties": {
+            "bis_similar_products": [
+                {"product_id": "1", "similar_ids": ["2", "3"], "enriched_at": "2025-10-30T12:00:00Z"}
+            ]
+        }}}
+    ]})
+
+    result = client.add_similar_products("test@example.com", "1", ["2", "3"], "2025-10-31T12:00:00Z")
+
+    assert result is True
+    client.client.patch.assert_not_called()
+
+
+def test_client_uses_given_http_client():
+    """Test that a shared HTTP client gets Klaviyo headers and carries requests."""
+    http_client = Mock()
+    http_client.headers = {}
+    http_client.get.return_value = _response({"data": []})
+
+    client = KlaviyoClient("pk_test", client=http_client)
+
+    assert client.get_profile_id_by_email("test@example.com") is None
+    assert http_client.headers["Authorization"] == "Klaviyo-API-Key pk_test"
+    http_client.get.assert_called_once()
+
+
+def test_retry_transport_retries_rate_limited_get(monkeypatch):
+    """Test that 429 responses are retried for idempotent requests only."""
+    import httpx
+    from app.clients import klaviyo_client
+
+    responses = [httpx.Response(429), httpx.Response(200)]
+    monkeypatch.setattr(httpx.HTTPTransport, "handle_request", lambda self, request: responses.pop(0))
+    monkeypatch.setattr(klaviyo_client.time, "sleep", lambda seconds: None)
+    transport = klaviyo_client._RetryTransport()
+
+    response = transport.handle_request(httpx.Request("GET", "https://a.klaviyo.com/api/profiles/"))
+    assert response.status_code == 200
+
+    responses[:] = [httpx.Response(429), httpx.Response(200)]
+    response = transport.handle_request(httpx.Request("POST", "https://a.klaviyo.com/api/profile-bulk-import-jobs/"))
+    assert response.status_code == 429
+
+
+def test_health_check_makes_single_attempt(monkeypatch):
+    """Test that the health probe skips the retrying transport."""
+    import httpcore
+    from httpcore._backends.sync import SyncBackend
+
+    attempts = []
+
+    def connect_tcp(self, host, port, **kwargs):
+        attempts.append(host)
+        raise httpcore.ConnectTimeout("timed out")
+
+    monkeypatch.setattr(SyncBackend, "connect_tcp", connect_tcp)
+    client = KlaviyoClient("pk_test")
+
+    assert client.health_check() is False
+    assert attempts == ["a.klaviyo.com"]
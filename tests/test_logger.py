@@ -0,0 +1,22 @@
+"""
+Tests for logging utilities.
+"""
+
+import logging
+import orjson
+import numpy as np
+from decimal import Decimal
+from app.utils.logger import JSONFormatter
+
+
+def test_json_formatter_serializes_non_json_values():
+    """Test that NumPy scalars and arbitrary objects in extra data don't break logging."""
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "Scored", None, None)
+    record.extra_data = {"score": np.float64(1.5), "count": np.int64(3), "price": Decimal("9.99")}
+
+    data = orjson.loads(JSONFormatter().format(record))
+
+    assert data["message"] == "Scored"
+    assert data["score"] == 1.5
+    assert data["count"] == 3
+    assert data["price"] == "9.99"
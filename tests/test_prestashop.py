@@ -0,0 +1,89 @@
+"""
+Tests for PrestaShop adapter.
+"""
+
+import orjson
+from unittest.mock import Mock
+from app.adapters.prestashop import PrestaShopAdapter
+
+
+def _response(data):
+    """Build mocked HTTP response returning given JSON data."""
+    response = Mock()
+    response.status_code = 200
+    response.content = orjson.dumps(data)
+    return response
+
+
+def test_get_products_by_category_merges_stock():
+    """Test that category products and stock are fetched and merged."""
+    adapter = PrestaShopAdapter("https://shop.example.com", "key")
+    assert adapter.session.auth == ("key", "")
+    adapter.session = Mock()
+    adapter.session.get.side_effect = [
+        _response({"products": [
+            {
+                "id": 1,
+                "name": [{"id": "1", "value": "Ciastka owsiane"}, {"id": "2", "value": "Oat cookies"}],
+                "id_category_default": "5",
+                "price": "12.50",
+                "manufacturer_name": "Acme"
+            },
+            {"id": 2, "name": "Keto bread", "id_category_default": "5", "price": "8.00"},
+        ]}),
+        _response({"stock_availables": [
+            {"id_product": "1", "quantity": "7"},
+            {"id_product": "2", "quantity": "0"},
+        ]}),
+    ]
+
+    products = adapter.get_products_by_category("5", limit=100)
+
+    assert adapter.session.get.call_count == 2
+    # API key travels as Basic auth, not in the query string
+    assert "ws_key" not in adapter.session.get.call_args_list[0][1]['params']
+    by_id = {p.id: p for p in products}
+    assert by_id["1"].name == "Ciastka owsiane"
+    assert by_id["1"].name_secondary == "Oat cookies"
+    assert by_id["1"].price == 12.5
+    assert by_id["1"].quantity == 7
+    assert by_id["2"].name == "Keto bread"
+    assert by_id["2"].quantity == 0
+
+
+def test_get_products_by_category_skips_malformed_products():
+    """Test that malformed product records are skipped, not fatal."""
+    adapter = PrestaShopAdapter("https://shop.example.com", "key")
+    adapter.session = Mock()
+    adapter.session.get.side_effect = [
+        _response({"products": [
+            {"id": 1, "name": "Oat cookies", "id_category_default": "5", "quantity": "many"},
+            "not-a-product",
+            {"id": 2, "name": "Keto bread", "id_category_default": "5"},
+        ]}),
+        _response({"stock_availables": [{"id_product": "2", "quantity": "3"}]}),
+    ]
+
+    products = adapter.get_products_by_category("5", limit=100)
+
+    assert [p.id for p in products] == ["2"]
+    assert products[0].quantity == 3
+
+
+def test_health_check_makes_single_attempt(monkeypatch):
+    """Test that the health probe is not retried on an unreachable host."""
+    import urllib3
+    from urllib3.exceptions import ConnectTimeoutError
+
+    attempts = []
+
+    def new_conn(self):
+        attempts.append(self.host)
+        raise ConnectTimeoutError(self, "timed out")
+
+    monkeypatch.setattr(urllib3.connection.HTTPConnection, "_new_conn", new_conn)
+    monkeypatch.setattr(urllib3.util.retry.time, "sleep", lambda seconds: None)
+    adapter = PrestaShopAdapter("http://shop.example.com", "key")
+
+    assert adapter.health_check() is False
+    assert attempts == ["shop.example.com"]
@@ -0,0 +1,155 @@
+"""
+Tests for product similarity scoring.
+"""
+
+import numpy as np
+import pytest
+from app.adapters.base import Product
+from app.services import product_similarity
+from app.services.product_similarity import (
+    build_bm25_context,
+    calculate_similarity_with_context,
+    score_candidate,
+    score_candidates,
+    score_candidates_jaccard,
+    top_k_indices
+)
+
+
+def test_score_candidate_matches_single_candidate_scoring(sample_product, sample_products):
+    """Test that shared context gives same scores as per-candidate scoring."""
+    context = build_bm25_context(sample_product, sample_products)
+
+    for candidate in sample_products:
+        assert score_candidate(sample_product, candidate, context) == \
+            calculate_similarity_with_context(sample_product, candidate, sample_products)
+
+
+def test_products_are_tokenized_once_at_creation(monkeypatch, sample_product):
+    """Test that scoring reuses tokens computed when products were created."""
+    products = [
+        Product(id=str(i), name=f"Keto Cookies {i}", name_secondary=f"Ciastka {i}", category_id="5")
+        for i in range(20)
+    ]
+    assert products[0].tokens_primary == frozenset({"keto", "cookies"})
+    assert products[0].tokens_secondary == frozenset({"ciastka"})
+
+    calls = []
+    tokenize = product_similarity._tokenize_product_name
+    monkeypatch.setattr(
+        product_similarity, "_tokenize_product_name",
+        lambda name: calls.append(name) or tokenize(name)
+    )
+
+    context = build_bm25_context(sample_product, products)
+    score_candidates(sample_product, products, context)
+    for candidate in products:
+        score_candidate(sample_product, candidate, context)
+
+    assert calls == []
+
+
+def test_score_candidate_prefers_shared_rare_words(sample_product, sample_products):
+    """Test that candidate sharing most words with original scores highest."""
+    context = build_bm25_context(sample_product, sample_products)
+
+    scores = {p.id: score_candidate(sample_product, p, context) for p in sample_products}
+
+    assert max(scores, key=scores.get) == "1"
+    assert scores["3"] > scores["4"]
+
+
+def test_score_candidates_matches_score_candidate():
+    """Test that vectorized scoring matches per-candidate scoring."""
+    original = Product(
+        id="0", name="Keto Oat Cookies 250g", name_secondary="Ciastka owsiane keto",
+        category_id="5", price=10.0, manufacturer_name="Acme"
+    )
+    candidates = [
+        Product(id="1", name="Keto Cookies", name_secondary="Ciastka keto", category_id="5",
+                price=11.0, manufacturer_name="ACME"),
+        Product(id="2", name="Oat Bread", category_id="5", price=30.0),
+        Product(id="3", name="Spiced Chocolate Cookies", name_secondary="Ciastka czekoladowe",
+                category_id="5", price=14.0, manufacturer_name="Other"),
+        Product(id="4", name="Mix", category_id="5"),
+    ]
+    context = build_bm25_context(original, candidates)
+
+    scores = score_candidates(original, candidates, context)
+
+    expected = [score_candidate(original, c, context) for c in candidates]
+    assert scores.tolist() == pytest.approx(expected)
+
+
+def test_score_candidates_matches_score_candidate_on_large_category(product_pool):
+    """Test that indexed scoring matches per-candidate scoring on a full category."""
+    original, candidates = product_pool[0], list(product_pool[1:])
+    context = build_bm25_context(original, candidates)
+
+    scores = score_candidates(original, candidates, context)
+
+    expected = [score_candidate(original, c, context) for c in candidates]
+    assert scores.tolist() == pytest.approx(expected)
+
+
+def test_tokenize_product_name_is_memoized():
+    """Test that repeated names reuse cached (immutable) token sets."""
+    tokens = product_similarity._tokenize_product_name("Keto Oat Cookies 250g")
+
+    assert tokens == frozenset({"keto", "oat", "cookies"})
+    assert product_similarity._tokenize_product_name("Keto Oat Cookies 250g") is tokens
+
+
+def test_score_candidates_without_shared_terms_keep_price_score():
+    """Test that candidates skipped by the inverted index still get price/manufacturer scores."""
+    original = Product(id="0", name="Keto Cookies", category_id="5", price=10.0, manufacturer_name="Acme")
+    candidates = [
+        Product(id="1", name="Keto Cookies", category_id="5", price=10.0),
+        Product(id="2", name="Oat Bread", category_id="5", price=10.5, manufacturer_name="acme"),
+    ]
+    context = build_bm25_context(original, candidates)
+
+    scores = score_candidates(original, candidates, context)
+
+    assert context.postings.docs("keto").tolist() == [context.doc_index["0"], context.doc_index["1"]]
+    assert scores[1] == pytest.approx(0.40)
+
+
+def test_build_bm25_context_separates_language_idf():
+    """Test that secondary names get their own IDF table."""
+    original = Product(id="0", name="Ciastka keto", name_secondary="Keto cookies", category_id="5")
+    products = [
+        Product(id="1", name="Chleb keto", name_secondary="Keto bread", category_id="5"),
+        Product(id="2", name="Ciastka owsiane", category_id="5"),
+    ]
+
+    context = build_bm25_context(original, products)
+
+    assert set(context.idf_scores) == {"ciastka", "keto", "chleb", "owsiane"}
+    assert set(context.idf_scores_secondary) == {"keto", "cookies", "bread"}
+    # "keto" is in every secondary name but only 2 of 3 primary names
+    assert context.idf_scores_secondary["keto"] < context.idf_scores["keto"]
+
+
+def test_score_candidates_jaccard_uses_token_overlap():
+    """Test that small-pool scoring compares names by Jaccard and keeps price weighting."""
+    original = Product(id="0", name="Keto Oat Cookies", category_id="5", price=10.0)
+    candidates = [
+        Product(id="1", name="Keto Oat Bread", category_id="5", price=10.0),
+        Product(id="2", name="Rye Bread", category_id="5", name_secondary="Keto Oat Cookies"),
+    ]
+
+    scores = score_candidates_jaccard(original, candidates)
+
+    # 2 shared of 4 distinct tokens; secondary name ignored when original has none
+    assert scores[0] == pytest.approx(0.60 * 0.5 + 0.30)
+    assert scores[1] == pytest.approx(0.0)
+
+
+def test_top_k_indices_best_first_ties_in_input_order():
+    """Test that top-k selection matches a full stable sort by score."""
+    scores = np.array([0.2, 0.9, 0.5, 0.9, 0.5, 0.1])
+
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 4, 0, 5]
+    assert top_k_indices(scores, 0).tolist() == []
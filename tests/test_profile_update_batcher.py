@@ -0,0 +1,68 @@
+"""
+Tests for Klaviyo profile update batcher.
+"""
+
+import orjson
+from unittest.mock import Mock
+from app.clients.klaviyo_client import KlaviyoClient
+from app.services.profile_update_batcher import ProfileUpdateBatcher
+
+
+def _response(data):
+    """Build mocked HTTP response returning given JSON data."""
+    response = Mock()
+    response.content = orjson.dumps(data)
+    return response
+
+
+def test_batcher_flushes_when_batch_is_full():
+    """Test that a full batch is sent without waiting for the window."""
+    client = Mock(spec=KlaviyoClient)
+    client.bulk_add_similar_products.return_value = {"a@example.com": True, "b@example.com": True}
+    batcher = ProfileUpdateBatcher(client, window_ms=60_000, max_batch_size=2)
+
+    futures = [
+        batcher.submit("a@example.com", "1", ["2"], "2025-10-30T12:00:00Z"),
+        batcher.submit("b@example.com", "1", ["3"], "2025-10-30T12:00:00Z"),
+    ]
+
+    assert [future.result(timeout=5) for future in futures] == [True, True]
+    client.bulk_add_similar_products.assert_called_once()
+
+
+def test_batcher_same_email_in_two_flushes_keeps_both_updates():
+    """Test that a flush reads a profile only after the previous job for it is applied."""
+    # Klaviyo applies bulk import jobs later, when their status is polled
+    stored = []
+    jobs = {}
+
+    def post(url, content):
+        job_id = f"J{len(jobs) + 1}"
+        jobs[job_id] = orjson.loads(content)['data']['attributes']['profiles']['data']
+        return _response({"data": {"type": "profile-bulk-import-job", "id": job_id}})
+
+    def get(url, params=None):
+        if "/profile-bulk-import-jobs/" in url:
+            job_id = url.rstrip("/").rsplit("/", 1)[1]
+            stored[:] = jobs[job_id][0]['attributes']['properties']['bis_similar_products']
+            return _response({"data": {"id": job_id, "attributes": {"status": "complete"}}})
+        return _response({"data": [
+            {"id": "P1", "attributes": {"email": "a@example.com", "properties": {
+                "bis_similar_products": list(stored)
+            }}}
+        ]})
+
+    client = KlaviyoClient("pk_test")
+    client.client = Mock()
+    client.client.post.side_effect = post
+    client.client.get.side_effect = get
+    batcher = ProfileUpdateBatcher(client, window_ms=60_000, max_batch_size=1)
+
+    futures = [
+        batcher.submit("a@example.com", "1", ["2"], "2025-10-30T12:00:00Z"),
+        batcher.submit("a@example.com", "4", ["5"], "2025-10-30T12:00:00Z"),
+    ]
+
+    assert [future.result(timeout=5) for future in futures] == [True, True]
+    second_job = jobs["J2"][0]['attributes']['properties']['bis_similar_products']
+    assert [item['product_id'] for item in second_job] == ["1", "4"]
@@ -2,6 +2,7 @@
 Tests for similar products service.
 """
 
+from unittest.mock import Mock
 from app.adapters.base import Product
 
 
@@ -50,14 +51,11 @@ def test_find_similar_products_empty_category(similar_products_service, mock_eco
 
 def test_enrich_profile_success(similar_products_service, mock_ecommerce_adapter, mock_klaviyo_client, sample_product):
     """Test successful profile enrichment."""
-    # Mock getting product
-    mock_ecommerce_adapter.get_product.return_value = sample_product
-
-    # Mock finding similar products
-    mock_ecommerce_adapter.get_products_by_category.return_value = [
+    # Mock getting product with its category products (one adapter call)
+    mock_ecommerce_adapter.get_product_with_siblings.return_value = (sample_product, [
         Product(id="1", name="Similar 1", category_id="5", quantity=10),
         Product(id="2", name="Similar 2", category_id="5", quantity=5),
-    ]
+    ])
 
     # Mock Klaviyo update
     mock_klaviyo_client.add_similar_products.return_value = True
@@ -71,10 +69,26 @@ def test_enrich_profile_success(similar_products_service, mock_ecommerce_adapter
     # Verify Klaviyo was called
     mock_klaviyo_client.add_similar_products.assert_called_once()
 
+    # Category listing came with the product, not from a second call
+    mock_ecommerce_adapter.get_product_with_siblings.assert_called_once_with("4422", limit=100)
+    mock_ecommerce_adapter.get_products_by_category.assert_not_called()
+
+
+def test_enrich_profile_cached_product_skips_prefetch(similar_products_service, mock_ecommerce_adapter, mock_klaviyo_client):
+    """Test that a cached product updates Klaviyo directly, with no profile prefetch."""
+    similar_products_service._cache_similar("4422", ["1", "2"])
+
+    result = similar_products_service.enrich_profile("test@example.com", "4422")
+
+    assert result['success'] is True
+    mock_ecommerce_adapter.get_product_with_siblings.assert_not_called()
+    mock_klaviyo_client.prefetch_profile.assert_not_called()
+    assert mock_klaviyo_client.add_similar_products.call_args[1]['prefetched'] is None
+
 
 def test_enrich_profile_product_not_found(similar_products_service, mock_ecommerce_adapter):
     """Test enrichment when product not found."""
-    mock_ecommerce_adapter.get_product.return_value = None
+    mock_ecommerce_adapter.get_product_with_siblings.return_value = (None, [])
 
     result = similar_products_service.enrich_profile("test@example.com", "9999")
 
@@ -91,3 +105,117 @@ def test_cleanup_profile(similar_products_service, mock_klaviyo_client):
 
     assert result is True
     mock_klaviyo_client.remove_similar_products.assert_called_once_with("test@example.com", "4422")
+
+
+def test_find_similar_products_returns_best_first(similar_products_service, mock_ecommerce_adapter, sample_product, sample_products):
+    """Test that top N products are returned in descending score order."""
+    mock_ecommerce_adapter.get_products_by_category.return_value = sample_products
+    similar_products_service.limit = 2
+
+    result = similar_products_service.find_similar_products(sample_product)
+
+    # Identical name first, then the other "Gluten-Free ... Mix" product
+    assert result == ["1", "2"]
+
+
+def test_find_similar_products_caches_result_per_product(similar_products_service, mock_ecommerce_adapter, sample_product, sample_products):
+    """Test that repeated lookups for the same product reuse the ranked result."""
+    mock_ecommerce_adapter.get_products_by_category.return_value = sample_products
+
+    first = similar_products_service.find_similar_products(sample_product)
+    first.append("mutated-by-caller")
+    second = similar_products_service.find_similar_products(sample_product)
+
+    mock_ecommerce_adapter.get_products_by_category.assert_called_once()
+    assert second == first[:-1]
+
+    # Enrichment for a cached product skips the e-commerce fetch entirely
+    similar_products_service.enrich_profile("test@example.com", sample_product.id)
+    mock_ecommerce_adapter.get_product_with_siblings.assert_not_called()
+
+
+def test_find_similar_products_large_category(similar_products_service, mock_ecommerce_adapter, product_pool):
+    """Test ranking a full category: in-stock only, anchor excluded, limit respected."""
+    original = product_pool[0]
+    mock_ecommerce_adapter.get_products_by_category.return_value = list(product_pool)
+
+    result = similar_products_service.find_similar_products(original)
+
+    in_stock = {p.id for p in product_pool if p.quantity > 0}
+    assert len(result) == similar_products_service.limit
+    assert original.id not in result
+    assert set(result) <= in_stock
+
+
+def test_find_similar_products_shares_bm25_corpus_per_category(similar_products_service, mock_ecommerce_adapter, sample_product, sample_products, monkeypatch):
+    """Test that products of one category share the BM25 corpus until the listing changes."""
+    from app.services import similar_products_service as service_module
+
+    similar_products_service.bm25_min_corpus = 0
+
+    builds = []
+    build = service_module.build_corpus_context
+    monkeypatch.setattr(
+        service_module, "build_corpus_context",
+        lambda products: builds.append(len(products)) or build(products)
+    )
+    mock_ecommerce_adapter.get_products_by_category.return_value = sample_products
+
+    # Two different products of the category, one corpus
+    similar_products_service.find_similar_products(sample_product)
+    similar_products_service.find_similar_products(Product(id="9", name="Keto Bread", category_id="5"))
+    assert builds == [4]
+
+    # Renamed product - new listing fingerprint
+    renamed = [*sample_products[:3], Product(id="4", name="Dark Chocolate Cake Mix", category_id="5", quantity=15)]
+    mock_ecommerce_adapter.get_products_by_category.return_value = renamed
+    similar_products_service.find_similar_products(Product(id="8", name="Cookie Mix", category_id="5"))
+    assert builds == [4, 4]
+
+
+def test_find_similar_products_small_pool_skips_bm25(similar_products_service, mock_ecommerce_adapter, sample_product, sample_products, monkeypatch):
+    """Test that pools below bm25_min_corpus are scored without a BM25 context."""
+    from app.services import similar_products_service as service_module
+
+    monkeypatch.setattr(service_module, "build_corpus_context", Mock(side_effect=AssertionError))
+    mock_ecommerce_adapter.get_products_by_category.return_value = sample_products
+    similar_products_service.limit = 2
+
+    result = similar_products_service.find_similar_products(sample_product)
+
+    assert len(sample_products) < similar_products_service.bm25_min_corpus
+    assert result == ["1", "2"]
+
+
+def test_enrich_profiles_scores_each_product_once(similar_products_service, mock_ecommerce_adapter, mock_klaviyo_client, sample_product, sample_products):
+    """Test that batch enrichment shares product lookups and sends one bulk update."""
+    mock_ecommerce_adapter.get_product_with_siblings.side_effect = lambda product_id, limit: (
+        (sample_product, sample_products) if product_id == "4422" else (None, [])
+    )
+    mock_klaviyo_client.bulk_add_similar_products.return_value = {
+        "a@example.com": True, "b@example.com": False
+    }
+
+    results = similar_products_service.enrich_profiles([
+        ("a@example.com", "4422"),
+        ("b@example.com", "4422"),
+        ("c@example.com", "9999"),
+    ])
+
+    assert mock_ecommerce_adapter.get_product_with_siblings.call_count == 2
+    mock_klaviyo_client.bulk_add_similar_products.assert_called_once()
+    entries = mock_klaviyo_client.bulk_add_similar_products.call_args[0][0]
+    assert [entry[0] for entry in entries] == ["a@example.com", "b@example.com"]
+
+    assert results[0]["success"] is True and results[0]["similar_count"] > 0
+    assert results[1]["success"] is False
+    assert results[2] == {"success": False, "similar_count": 0, "error": "Product not found"}
+
+
+def test_submit_enrichment_runs_in_background(similar_products_service, mock_ecommerce_adapter, sample_product):
+    """Test that queued enrichment resolves to the enrich_profile result."""
+    mock_ecommerce_adapter.get_product_with_siblings.return_value = (None, [])
+
+    future = similar_products_service.submit_enrichment("test@example.com", "9999")
+
+    assert future.result(timeout=5)['error'] == "Product not found"
@@ -0,0 +1,68 @@
+"""
+Tests for webhook endpoints.
+"""
+
+import pytest
+from flask import Flask
+from unittest.mock import Mock
+import app as app_module
+from app import OrjsonProvider
+from app.webhooks import cleanup, enrich
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Test client with webhook blueprints and webhook secret check disabled."""
+    monkeypatch.setattr(enrich, "validate_webhook_secret", lambda token: True)
+    monkeypatch.setattr(cleanup, "validate_webhook_secret", lambda token: True)
+
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.register_blueprint(enrich.bp)
+    app.register_blueprint(cleanup.bp)
+    return app.test_client()
+
+
+@pytest.mark.parametrize("path", ["/webhook/enrich", "/webhook/enrich/batch", "/webhook/cleanup"])
+def test_malformed_json_returns_bad_request(client, path):
+    """Test that an invalid JSON body is rejected with 400, not 500."""
+    response = client.post(path, data=b'{"email": ', content_type="application/json")
+
+    assert response.status_code == 400
+    assert response.get_json() == {"status": "error", "message": "Invalid JSON"}
+
+
+def test_enrich_batch_enriches_all_pairs(client, monkeypatch):
+    """Test that the batch webhook passes all pairs to one enrich_profiles() call."""
+    service = Mock()
+    service.enrich_profiles.return_value = [
+        {"success": True, "similar_count": 6, "error": None},
+        {"success": False, "similar_count": 0, "error": "Product not found"},
+    ]
+    monkeypatch.setattr(app_module, "get_service", lambda: service)
+
+    response = client.post("/webhook/enrich/batch", json={"profiles": [
+        {"email": "a@example.com", "ProductID": "4422"},
+        {"email": "b@example.com", "ProductID": "9999"},
+    ]})
+
+    assert response.status_code == 200
+    service.enrich_profiles.assert_called_once_with([
+        ("a@example.com", "4422"), ("b@example.com", "9999")
+    ])
+    body = response.get_json()
+    assert body["enriched_count"] == 1
+    assert body["results"][1] == {
+        "email": "b@example.com", "ProductID": "9999",
+        "success": False, "similar_count": 0, "error": "Product not found"
+    }
+
+
+def test_enrich_batch_rejects_incomplete_pair(client):
+    """Test that a pair without ProductID rejects the whole batch."""
+    response = client.post("/webhook/enrich/batch", json={"profiles": [
+        {"email": "a@example.com", "ProductID": "4422"},
+        {"email": "b@example.com"},
+    ]})
+
+    assert response.status_code == 400